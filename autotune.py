@@ -0,0 +1,178 @@
+# =============================================================================
+# FILE: autotune.py
+# DESKRIPSI: Kalibrasi otomatis jumlah thread torch (intra-op dan inter-op)
+#            serta ukuran batch untuk host saat ini, memakai input sintetis
+#            224x224. Frontier throughput/latensi dan setelan terbaik disimpan
+#            ke profil lokal yang dibaca `ModelHandler` saat startup.
+#
+# Contoh:
+#   python autotune.py --threads 1 2 4 8 --interop 1 2 --batch-sizes 1 4 8 16 32
+# =============================================================================
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import time
+
+import numpy as np
+
+import config
+from model_handler import ModelHandler
+
+
+def _measure(handler, batch_size, iterations, warmup=2):
+    """Mengukur latensi per batch (detik) untuk input uint8 acak berukuran INPUT_SIZE."""
+    width, height = config.INPUT_SIZE
+    rng = np.random.default_rng(0)
+    batch = rng.integers(0, 256, size=(batch_size, height, width, 3), dtype=np.uint8)
+    for _ in range(warmup):
+        handler._run(batch)
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        handler._run(batch)
+        timings.append(time.perf_counter() - start)
+    return np.asarray(timings)
+
+
+def _sweep_interop(model_path, backend, interop, threads_list, batch_sizes, iterations):
+    """
+    Dijalankan di proses baru (spawn): jumlah thread inter-op hanya bisa diatur
+    sekali sebelum torch melakukan kerja paralel apa pun.
+    """
+    import torch
+    torch.set_num_interop_threads(interop)
+
+    handler = ModelHandler(model_path, use_cache=False, backend=backend)
+    if not handler.is_model_loaded():
+        raise RuntimeError("Model tidak dapat dimuat untuk autotune.")
+    if handler.backend == "onnx":
+        raise ValueError("Autotune mengukur thread torch; gunakan backend fastai/torchscript/weights.")
+
+    rows = []
+    for threads in threads_list:
+        torch.set_num_threads(threads)
+        for batch_size in batch_sizes:
+            timings = _measure(handler, batch_size, iterations)
+            rows.append({
+                "num_threads": threads,
+                "interop_threads": interop,
+                "batch_size": batch_size,
+                "throughput": float(batch_size / timings.mean()),
+                "latency_p50_ms": float(np.percentile(timings, 50) * 1000.0),
+                "latency_p95_ms": float(np.percentile(timings, 95) * 1000.0),
+            })
+            print(f"   > threads={threads} interop={interop} batch={batch_size}: "
+                  f"{rows[-1]['throughput']:.1f} img/s, p95 {rows[-1]['latency_p95_ms']:.1f} ms")
+    return rows
+
+
+def pareto_frontier(rows):
+    """Titik yang tidak kalah di throughput (lebih tinggi) dan latensi p95 (lebih rendah)."""
+    frontier = []
+    for row in sorted(rows, key=lambda r: (r["latency_p95_ms"], -r["throughput"])):
+        if not frontier or row["throughput"] > frontier[-1]["throughput"]:
+            frontier.append(row)
+    return frontier
+
+
+def choose_best(rows, latency_budget_ms):
+    """Throughput tertinggi yang p95-nya masih di bawah anggaran latensi."""
+    within = [r for r in rows if r["latency_p95_ms"] <= latency_budget_ms]
+    if not within:
+        return min(rows, key=lambda r: r["latency_p95_ms"])
+    return max(within, key=lambda r: r["throughput"])
+
+
+def _cpu_model():
+    """Nama model CPU (mis. "Intel(R) Xeon(R) ..."); string kosong jika tidak diketahui."""
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.lower().startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def host_signature():
+    """
+    Identitas perangkat keras untuk memastikan profil dipakai di mesin yang
+    setara. Hostname sengaja tidak dipakai: di container nilainya acak setiap
+    deploy, padahal hasil tuning tetap berlaku untuk CPU yang sama.
+    """
+    return {"cpu_model": _cpu_model(), "cpu_count": os.cpu_count(), "machine": platform.machine()}
+
+
+def autotune(model_path=config.MODEL_PATH, backend=None, threads_list=None, interop_list=None,
+             batch_sizes=None, iterations=10, latency_budget_ms=None):
+    """Menjalankan sweep lengkap dan mengembalikan profil (belum disimpan)."""
+    cpus = os.cpu_count() or 1
+    threads_list = threads_list or sorted({1, 2, 4, max(1, cpus // 2), cpus} & set(range(1, cpus + 1)))
+    interop_list = interop_list or [1, 2]
+    batch_sizes = batch_sizes or [1, 4, 8, 16, 32]
+    latency_budget_ms = latency_budget_ms or config.AUTOTUNE_CONFIG["latency_budget_ms"]
+
+    ctx = mp.get_context("spawn")
+    rows = []
+    for interop in interop_list:
+        with ctx.Pool(1) as pool:
+            rows += pool.apply(_sweep_interop, (model_path, backend, interop, threads_list,
+                                                batch_sizes, iterations))
+
+    best = choose_best(rows, latency_budget_ms)
+    return {
+        "host": host_signature(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "latency_budget_ms": latency_budget_ms,
+        "best": {key: best[key] for key in ("num_threads", "interop_threads", "batch_size")},
+        "frontier": pareto_frontier(rows),
+        "results": rows,
+    }
+
+
+def save_profile(profile, path=None):
+    path = path or config.AUTOTUNE_CONFIG["profile_path"]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    return path
+
+
+def load_profile(path=None):
+    """Membaca profil jika ada dan dibuat di perangkat keras yang sama (model CPU, jumlah CPU, arsitektur)."""
+    path = path or config.AUTOTUNE_CONFIG["profile_path"]
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        profile = json.load(f)
+    host = host_signature()
+    if profile.get("host") != host:
+        print(f"⚠️ Profil autotune {path} diabaikan: dibuat untuk {profile.get('host')}, host ini {host}. "
+              "Jalankan ulang autotune.py.")
+        return None
+    return profile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Autotune thread torch dan ukuran batch untuk host ini.")
+    parser.add_argument("--model", default=config.MODEL_PATH, help="Path file model")
+    parser.add_argument("--backend", default=None)
+    parser.add_argument("--threads", type=int, nargs="*", default=None)
+    parser.add_argument("--interop", type=int, nargs="*", default=None)
+    parser.add_argument("--batch-sizes", type=int, nargs="*", default=None)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--latency-budget-ms", type=float, default=None)
+    parser.add_argument("--output", default=None, help="Path profil (default AUTOTUNE_CONFIG)")
+    args = parser.parse_args(argv)
+
+    profile = autotune(args.model, args.backend, args.threads, args.interop, args.batch_sizes,
+                       args.iterations, args.latency_budget_ms)
+    path = save_profile(profile, args.output)
+    print(f"✅ Setelan terbaik: {profile['best']} -> {path}")
+
+
+if __name__ == "__main__":
+    main()
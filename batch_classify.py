@@ -0,0 +1,226 @@
+# =============================================================================
+# FILE: batch_classify.py
+# DESKRIPSI: CLI untuk mengklasifikasikan seluruh gambar di sebuah folder.
+#            Decode gambar berjalan di process pool, forward pass di-batch,
+#            hasil ditulis bertahap ke JSONL/CSV dengan checkpoint agar
+#            proses yang terhenti bisa dilanjutkan.
+#
+# Contoh:
+#   python batch_classify.py arsip/ hasil.jsonl
+#   python batch_classify.py arsip/ hasil.csv --workers 8 --batch-size 64
+# =============================================================================
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+import image_decode
+import metrics
+from model_handler import ModelHandler
+
+
+def iter_image_paths(root):
+    """Menelusuri folder secara rekursif dengan urutan deterministik."""
+    extensions = {f".{ext.lower()}" for ext in config.ALLOWED_EXTENSIONS}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in extensions:
+                yield os.path.join(dirpath, name)
+
+
+def iter_labeled_images(root, class_names):
+    """
+    Menelusuri folder berlabel (`root/<kelas>/**/gambar`). Nama subfolder
+    dicocokkan dengan `class_names` tanpa membedakan huruf besar/kecil.
+    Menghasilkan pasangan `(path, indeks_kelas)`; subfolder lain dilewati.
+    """
+    index = {name.lower(): i for i, name in enumerate(class_names)}
+    for entry in sorted(os.listdir(root)):
+        label = index.get(entry.lower())
+        if label is not None and os.path.isdir(os.path.join(root, entry)):
+            for path in iter_image_paths(os.path.join(root, entry)):
+                yield path, label
+
+
+def decode_for_model(path):
+    """
+    Dijalankan di proses worker: membuka dan menyiapkan gambar menjadi
+    array uint8 siap-model. Error dikembalikan sebagai string, bukan dilempar.
+    """
+    try:
+        with open(path, "rb") as f:
+            return path, image_decode.decode_for_model(f.read()), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def predict_items(handler, items, workers=None, batch_size=config.BATCH_SIZE):
+    """
+    Decode `items` di process pool lalu forward per batch. Item berupa path
+    atau tuple yang elemen pertamanya path. Menghasilkan `(items, probs,
+    errors)` per batch dengan urutan yang sama seperti masukan: `probs[i]`
+    adalah array probabilitas, atau None jika decode gagal dengan pesan
+    `errors[i]`.
+    """
+    # Batasi jumlah tugas decode yang sedang berjalan agar memori tetap konstan
+    max_inflight = batch_size * 4
+    todo = iter(items)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        batch = []
+        while True:
+            while len(pending) < max_inflight:
+                item = next(todo, None)
+                if item is None:
+                    break
+                path = item[0] if isinstance(item, tuple) else item
+                pending.append((item, pool.submit(decode_for_model, path)))
+            if not pending and not batch:
+                break
+
+            if pending:
+                item, future = pending.popleft()
+                _, array, error = future.result()
+                batch.append((item, array, error))
+            if len(batch) < batch_size and pending:
+                continue
+
+            arrays = [array for _, array, error in batch if error is None]
+            rows = iter(handler.predict_batch(arrays, batch_size)[1] if arrays else ())
+            yield ([item for item, _, _ in batch],
+                   [next(rows) if error is None else None for _, _, error in batch],
+                   [error for _, _, error in batch])
+            batch = []
+
+
+class ResultWriter:
+    """Menulis hasil ke JSONL atau CSV (ditentukan dari ekstensi file output)."""
+
+    def __init__(self, path, class_names, resume_offset=0):
+        self.path = path
+        self.class_names = class_names
+        self.is_csv = path.lower().endswith(".csv")
+        mode = "r+" if resume_offset and os.path.exists(path) else "w"
+        self._file = open(path, mode, newline="", encoding="utf-8")
+        if mode == "r+":
+            # Buang baris yang mungkin setengah tertulis setelah checkpoint terakhir
+            self._file.seek(resume_offset)
+            self._file.truncate()
+        self._csv = None
+        if self.is_csv:
+            self._csv = csv.writer(self._file)
+            if mode == "w":
+                self._csv.writerow(["path", "prediction", "confidence", "error"] + class_names)
+
+    def write(self, path, probs=None, error=None):
+        if probs is not None:
+            idx = int(probs.argmax())
+            prediction, confidence = self.class_names[idx], float(probs[idx])
+        else:
+            prediction, confidence = None, None
+
+        if self.is_csv:
+            values = [f"{p:.6f}" for p in probs] if probs is not None else [""] * len(self.class_names)
+            self._csv.writerow([path, prediction or "", "" if confidence is None else f"{confidence:.6f}",
+                                error or ""] + values)
+        else:
+            record = {"path": path, "prediction": prediction, "confidence": confidence}
+            if probs is not None:
+                record["probabilities"] = {
+                    name: round(float(p), 6) for name, p in zip(self.class_names, probs)
+                }
+            if error:
+                record["error"] = error
+            self._file.write(json.dumps(record) + "\n")
+
+    def flush(self):
+        """Flush ke disk dan kembalikan offset byte saat ini (untuk checkpoint)."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return {"done": 0, "offset": 0, "last_path": None}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, done, offset, last_path):
+    """Simpan checkpoint secara atomik (tulis file sementara lalu rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"done": done, "offset": offset, "last_path": last_path}, f)
+    os.replace(tmp_path, path)
+
+
+def classify_folder(root, output, model_path=config.MODEL_PATH, workers=None,
+                    batch_size=config.BATCH_SIZE, resume=True):
+    """Mengklasifikasikan semua gambar di `root` dan menulis hasil ke `output`."""
+    checkpoint_path = f"{output}.ckpt"
+    paths = list(iter_image_paths(root))
+    state = load_checkpoint(checkpoint_path) if resume else {"done": 0, "offset": 0, "last_path": None}
+
+    done = state["done"]
+    if done and (done > len(paths) or paths[done - 1] != state["last_path"]):
+        raise RuntimeError(
+            f"Checkpoint {checkpoint_path} tidak cocok dengan isi folder; "
+            "jalankan ulang dengan --no-resume."
+        )
+    if done:
+        print(f"Melanjutkan dari checkpoint: {done}/{len(paths)} gambar sudah diproses.")
+
+    handler = ModelHandler(model_path, use_cache=False, slots=1)
+    if not handler.is_model_loaded():
+        # Tanpa model, predict_batch jatuh ke prediksi acak; jangan sampai tertulis ke hasil/checkpoint
+        raise RuntimeError(f"Model tidak dapat dimuat dari {model_path}; klasifikasi dibatalkan.")
+    class_names = [name.capitalize() for name in handler.waste_types]
+    writer = ResultWriter(output, class_names, resume_offset=state["offset"] if done else 0)
+
+    try:
+        for batch, probs, errors in predict_items(handler, paths[done:], workers, batch_size):
+            for path, row, error in zip(batch, probs, errors):
+                writer.write(path, row, error)
+
+            done += len(batch)
+            save_checkpoint(checkpoint_path, done, writer.flush(), batch[-1])
+            print(f"\r   > {done}/{len(paths)} gambar", end="", file=sys.stderr)
+    finally:
+        writer.close()
+    print(file=sys.stderr)
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Klasifikasi massal gambar sampah dalam sebuah folder.")
+    parser.add_argument("root", help="Folder berisi gambar (ditelusuri rekursif)")
+    parser.add_argument("output", help="File hasil (.jsonl atau .csv)")
+    parser.add_argument("--model", default=config.MODEL_PATH, help="Path file model")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses decode")
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_SIZE)
+    parser.add_argument("--no-resume", action="store_true", help="Abaikan checkpoint yang ada")
+    parser.add_argument("--metrics-file", default=config.METRICS_CONFIG["file"],
+                        help="Tulis metrik latensi (format Prometheus) ke file ini")
+    args = parser.parse_args(argv)
+
+    # Decode berjalan di process pool, jadi metrik di sini mencakup forward dan counter batch
+    metrics.start_file_dumper(args.metrics_file)
+    total = classify_folder(args.root, args.output, model_path=args.model, workers=args.workers,
+                            batch_size=args.batch_size, resume=not args.no_resume)
+    if args.metrics_file:
+        metrics.REGISTRY.dump_to_file(args.metrics_file)
+    print(f"Selesai: {total} gambar diklasifikasikan -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""
+Benchmark inferensi: throughput dan latensi p50/p95/p99 untuk jalur satu
+gambar, batch, dan tiap tahap (decode, pra-pemrosesan, forward).
+
+Jalankan dari root repo:
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --output bench_baru.json --compare bench.json
+"""
@@ -0,0 +1,176 @@
+# =============================================================================
+# FILE: benchmarks/run.py
+# DESKRIPSI: Mengukur throughput dan latensi p50/p95/p99 ModelHandler untuk
+#            jalur satu gambar dan batch, serta tahap decode, pra-pemrosesan,
+#            dan forward secara terpisah, pada beberapa ukuran dan format
+#            gambar. Hasil ditulis sebagai JSON agar bisa dibandingkan antar
+#            run untuk mendeteksi regresi.
+#
+# Contoh:
+#   python -m benchmarks.run --output bench.json
+#   python -m benchmarks.run --model my_model.pkl --output bench.json
+#   python -m benchmarks.run --output baru.json --compare bench.json --threshold 0.10
+# =============================================================================
+
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+import config
+import image_decode
+from autotune import host_signature
+from benchmarks.stand_in import build_stand_in_handler, synthetic_image
+from model_handler import ModelHandler
+from preprocessing import prepare_image
+
+DEFAULT_SIZES = ["640x480", "1920x1080", "4032x3024"]
+DEFAULT_FORMATS = ["JPEG", "PNG"]
+DEFAULT_BATCH_SIZES = [1, 8, 32]
+
+
+def summarize(timings, items_per_call=1):
+    """Ringkasan latensi (ms) per panggilan dan throughput (item/detik)."""
+    timings = np.asarray(timings)
+    ms = timings * 1000.0
+    return {
+        "n": int(len(timings)),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "throughput": float(items_per_call * len(timings) / timings.sum()),
+    }
+
+
+def time_calls(func, iterations, warmup=3):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def encode(array, fmt):
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format=fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+    return buffer.getvalue()
+
+
+def run_benchmarks(handler, sizes, formats, batch_sizes, iterations):
+    """Menjalankan semua skenario; mengembalikan daftar baris hasil."""
+    results = []
+
+    def record(stage, summary, **labels):
+        row = {"stage": stage, **labels, **summary}
+        results.append(row)
+        print(f"   > {stage:<14} {json.dumps(labels):<45} p50 {row['p50_ms']:8.2f} ms  "
+              f"p99 {row['p99_ms']:8.2f} ms  {row['throughput']:8.1f}/s", file=sys.stderr)
+
+    for size in sizes:
+        width, height = (int(v) for v in size.split("x"))
+        array = synthetic_image(width, height)
+        for fmt in formats:
+            data = encode(array, fmt)
+            labels = {"size": size, "format": fmt}
+
+            decoded = image_decode.decode(data)
+            record("decode", summarize(time_calls(lambda: image_decode.decode(data), iterations)), **labels)
+            record("preprocess", summarize(time_calls(lambda: prepare_image(decoded), iterations)), **labels)
+            record("single", summarize(time_calls(
+                lambda: handler.predict(image_decode.decode(data)), iterations)), **labels)
+
+    # Forward dan batch tidak bergantung pada ukuran/format sumber: input sudah 224x224
+    width, height = config.INPUT_SIZE
+    for batch_size in batch_sizes:
+        batch = np.stack([synthetic_image(width, height, seed=i) for i in range(batch_size)])
+        record("forward", summarize(time_calls(lambda: handler._run(batch), iterations), batch_size),
+               batch_size=batch_size)
+        images = list(batch)
+        record("predict_batch", summarize(time_calls(
+            lambda: handler.predict_batch(images, batch_size), iterations), batch_size),
+            batch_size=batch_size)
+    return results
+
+
+def _row_key(row):
+    return (row["stage"], row.get("size"), row.get("format"), row.get("batch_size"))
+
+
+def compare(current, baseline, threshold=0.10):
+    """
+    Membandingkan p50 dua hasil benchmark. Mengembalikan daftar regresi:
+    skenario yang p50-nya naik lebih dari `threshold` (mis. 0.10 = 10%).
+    """
+    previous = {_row_key(row): row for row in baseline["results"]}
+    regressions = []
+    for row in current["results"]:
+        old = previous.get(_row_key(row))
+        if old is None or old["p50_ms"] <= 0:
+            continue
+        change = row["p50_ms"] / old["p50_ms"] - 1.0
+        if change > threshold:
+            regressions.append({"scenario": _row_key(row), "baseline_p50_ms": old["p50_ms"],
+                                "p50_ms": row["p50_ms"], "change": change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark inferensi ModelHandler.")
+    parser.add_argument("--model", default=None,
+                        help="Path model asli; default memakai ResNet34 pengganti (bobot acak, seed tetap)")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--sizes", nargs="*", default=DEFAULT_SIZES, help="Ukuran sumber, mis. 1920x1080")
+    parser.add_argument("--formats", nargs="*", default=DEFAULT_FORMATS, choices=DEFAULT_FORMATS)
+    parser.add_argument("--batch-sizes", type=int, nargs="*", default=DEFAULT_BATCH_SIZES)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", default=None, help="File JSON hasil sebelumnya sebagai pembanding")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Batas kenaikan p50 (rasio)")
+    args = parser.parse_args(argv)
+
+    if args.model:
+        # Satu forward sekaligus dengan semua core, sama seperti stand-in `from_net`
+        handler = ModelHandler(args.model, use_cache=False, slots=1)
+    else:
+        handler = build_stand_in_handler(seed=args.seed)
+
+    import torch
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "model": args.model or f"stand-in resnet34 (seed {args.seed})",
+            "backend": handler.backend,
+            "decode_backend": config.DECODE_BACKEND,
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "torch_threads": torch.get_num_threads(),
+            "host": host_signature(),
+        },
+        "results": run_benchmarks(handler, args.sizes, args.formats, args.batch_sizes, args.iterations),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Hasil benchmark disimpan ke {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for item in regressions:
+            print(f"⚠️ Regresi {item['scenario']}: {item['baseline_p50_ms']:.2f} -> "
+                  f"{item['p50_ms']:.2f} ms (+{item['change']:.0%})")
+        if regressions:
+            raise SystemExit(1)
+        print("Tidak ada regresi di atas ambang.")
+
+
+if __name__ == "__main__":
+    main()
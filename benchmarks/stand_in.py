@@ -0,0 +1,37 @@
+# =============================================================================
+# FILE: benchmarks/stand_in.py
+# DESKRIPSI: Model pengganti deterministik untuk benchmark: ResNet34 dengan
+#            head fastai yang diinisialisasi acak (seed tetap), sehingga
+#            benchmark bisa berjalan tanpa `my_model.pkl`. Biaya komputasinya
+#            sama dengan model asli; prediksinya tidak bermakna.
+# =============================================================================
+
+import numpy as np
+import torch
+
+import config
+import inference_net
+from model_handler import ModelHandler
+
+
+def build_stand_in_net(arch="resnet34", n_classes=None, seed=0):
+    """`InferenceNet` dengan bobot acak yang selalu sama untuk `seed` yang sama."""
+    n_classes = n_classes or len(config.WASTE_CATEGORIES)
+    torch.manual_seed(seed)
+    return inference_net.InferenceNet(inference_net.build_learner_model(arch, n_classes)).eval()
+
+
+def build_stand_in_handler(arch="resnet34", seed=0):
+    """`ModelHandler` di atas model pengganti (tanpa cache, agar setiap panggilan diukur)."""
+    net = build_stand_in_net(arch, seed=seed)
+    return ModelHandler.from_net(net, config.WASTE_CATEGORIES, fingerprint=f"stand-in-{arch}-{seed}")
+
+
+def synthetic_image(width, height, seed=0):
+    """Gambar sintetis deterministik: gradien halus + noise, mirip foto dari sisi kompresi."""
+    rng = np.random.default_rng(seed)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None, None]
+    x = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    base = (x * np.array([1.0, 0.5, 0.2]) + y * np.array([0.2, 0.5, 1.0])) / 1.2
+    noise = rng.normal(0, 12, size=(height, width, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
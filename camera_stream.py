@@ -0,0 +1,324 @@
+# =============================================================================
+# FILE: camera_stream.py
+# DESKRIPSI: Klasifikasi kontinu dari kamera lokal, stream RTSP, atau file
+#            video (sebagai pengganti kamera saat uji). Frame dibaca di thread
+#            sendiri dan dititipkan ke slot berkapasitas satu: frame terbaru
+#            selalu menimpa frame yang belum diproses, sehingga inferensi
+#            tidak pernah tertinggal dari waktu nyata. Frame yang pasti tidak
+#            akan terpakai (berdasarkan latensi forward terukur) di-skip
+#            sebelum di-decode.
+#
+# Contoh:
+#   python camera_stream.py 0                       # kamera /dev/video0
+#   python camera_stream.py rtsp://kamera.lokal/stream
+#   python camera_stream.py rekaman_conveyor.mp4 --max-seconds 30
+# =============================================================================
+
+import argparse
+import math
+import threading
+import time
+
+from PIL import Image
+
+import config
+import metrics
+
+
+def open_capture(source):
+    """Membuka sumber video dengan OpenCV (dependensi opsional)."""
+    try:
+        import cv2
+    except ImportError:
+        raise ImportError("Mode stream membutuhkan OpenCV: pip install opencv-python-headless") from None
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise RuntimeError(f"Sumber video tidak bisa dibuka: {source}")
+    return capture
+
+
+class LatestFrameSlot:
+    """Antrean satu slot: `put` menimpa frame lama yang belum diambil (dihitung sebagai drop)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Mengambil frame terbaru; None jika tidak ada frame dalam `timeout` detik."""
+        with self._cond:
+            if self._frame is None:
+                self._cond.wait(timeout)
+            frame, self._frame = self._frame, None
+            return frame
+
+
+class StreamClassifier:
+    """
+    Dua thread: pembaca frame dan klasifikasi. Pembaca memakai `grab()`
+    (tanpa decode) untuk frame yang akan dilewati dan `retrieve()` hanya
+    untuk setiap frame ke-k, dengan k = ceil(latensi_forward x fps_sumber).
+    Sisa ketidakcocokan ditangani slot latest-frame-wins.
+    """
+
+    def __init__(self, handler, source, realtime=None, on_result=None):
+        self.handler = handler
+        self.source = source
+        self.on_result = on_result
+        self.slot = LatestFrameSlot()
+        self._capture = open_capture(source)
+        import cv2
+        self._cv2 = cv2
+        self.source_fps = self._capture.get(cv2.CAP_PROP_FPS) or config.STREAM_CONFIG["default_fps"]
+        # File video dibaca secepat disk; tahan ke fps aslinya agar menyerupai kamera
+        self.realtime = realtime if realtime is not None else not _is_live(source)
+        self.latency_ema = None
+        self.frames_read = 0
+        self.frames_skipped = 0
+        self.frames_classified = 0
+        self.latest = None  # (frame RGB, prediksi, probabilitas, waktu)
+        self.error = None   # pesan error yang menghentikan thread klasifikasi
+        self.started_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._threads = [
+            threading.Thread(target=self._read_loop, name="stream-reader", daemon=True),
+            threading.Thread(target=self._classify_loop, name="stream-classifier", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, wait=True):
+        """
+        Meminta kedua thread berhenti. Capture dilepas oleh thread pembaca
+        sendiri (lihat `_read_loop`), jadi `release()` tidak pernah berjalan
+        bersamaan dengan `grab()` yang mungkin masih memblokir pada RTSP.
+        """
+        self._stop.set()
+        if not self._threads:
+            self._capture.release()  # belum pernah di-start
+            return
+        if wait:
+            for thread in self._threads:
+                thread.join(timeout=2.0)
+
+    def _frames_per_inference(self):
+        if self.latency_ema is None:
+            return 1
+        return max(1, math.ceil(self.latency_ema * self.source_fps))
+
+    def _read_loop(self):
+        frame_interval = 1.0 / self.source_fps
+        next_due = time.perf_counter()
+        position = 0
+        try:
+            while not self._stop.is_set():
+                if not self._capture.grab():
+                    break
+                position += 1
+                self.frames_read += 1
+                if self.realtime:
+                    next_due += frame_interval
+                    delay = next_due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                if position % self._frames_per_inference():
+                    self.frames_skipped += 1
+                    continue
+                ok, frame = self._capture.retrieve()
+                if ok:
+                    self.slot.put(self._cv2.cvtColor(frame, self._cv2.COLOR_BGR2RGB))
+        finally:
+            self._stop.set()
+            self._capture.release()
+
+    def _classify_loop(self):
+        smoothing = config.STREAM_CONFIG["latency_smoothing"]
+        names = [str(name).capitalize() for name in self.handler.waste_types]
+        try:
+            while not self._stop.is_set():
+                frame = self.slot.get(timeout=0.5)
+                if frame is None:
+                    continue
+                # Langsung ke forward, melewati cache dan indeks near-duplicate dari `predict`:
+                # hit cache membuat EMA latensi terlalu kecil sehingga frame yang di-skip terlalu sedikit
+                start = time.perf_counter()
+                pred_idx, probs = self.handler.predict_batch([Image.fromarray(frame)])
+                latency = time.perf_counter() - start
+                prediction = names[int(pred_idx[0])]
+                probabilities = dict(zip(names, probs[0].tolist()))
+                with self._lock:
+                    self.latency_ema = latency if self.latency_ema is None else (
+                        smoothing * latency + (1 - smoothing) * self.latency_ema)
+                    self.frames_classified += 1
+                    self.latest = (frame, prediction, probabilities, time.time())
+                if self.on_result is not None:
+                    self.on_result(prediction, probabilities)
+        except Exception as e:
+            self.error = str(e)
+            metrics.inc("stream_errors")
+            print(f"❌ Klasifikasi stream {self.source} berhenti: {e}")
+        finally:
+            # Tanpa thread klasifikasi, pembaca juga harus berhenti agar kamera dilepas
+            # dan StreamManager.reap membersihkan stream ini
+            self._stop.set()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        with self._lock:
+            return {
+                "source_fps": self.source_fps,
+                "effective_fps": self.frames_classified / elapsed if elapsed else 0.0,
+                "frames_read": self.frames_read,
+                "frames_skipped": self.frames_skipped,
+                "frames_dropped": self.slot.dropped,
+                "frames_classified": self.frames_classified,
+                "forward_ms": 1000.0 * self.latency_ema if self.latency_ema is not None else 0.0,
+                "frames_per_inference": self._frames_per_inference(),
+                "error": self.error,
+            }
+
+
+class StreamManager:
+    """
+    Stream milik semua sesi Streamlit dalam satu proses. Hanya sumber dari
+    allow-list yang dibuka, jumlah stream bersamaan dibatasi, dan stream
+    yang sesinya berhenti mengirim heartbeat (tab ditutup, pindah halaman)
+    dihentikan oleh thread reaper agar kamera dan CPU tidak tertahan.
+    """
+
+    def __init__(self, sources=None, max_streams=None, heartbeat_timeout=None):
+        self.sources = list(sources if sources is not None else config.STREAM_CONFIG["sources"])
+        self.max_streams = max_streams or config.STREAM_CONFIG["max_streams"]
+        self.heartbeat_timeout = heartbeat_timeout or config.STREAM_CONFIG["heartbeat_timeout"]
+        self.reaped = 0
+        self._streams = {}  # session_id -> [StreamClassifier atau None saat dibuka, heartbeat terakhir]
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def start(self, session_id, handler, source):
+        if str(source) not in self.sources:
+            raise ValueError(f"Sumber video tidak diizinkan: {source}")
+        self.stop(session_id)
+        with self._lock:
+            if len(self._streams) >= self.max_streams:
+                raise RuntimeError(config.ERROR_MESSAGES["too_many_streams"])
+            # Slot dipesan dulu: membuka RTSP bisa lama dan tidak dilakukan di dalam lock
+            self._streams[session_id] = [None, time.monotonic()]
+        try:
+            stream = StreamClassifier(handler, source).start()
+        except Exception:
+            with self._lock:
+                self._streams.pop(session_id, None)
+            raise
+        with self._lock:
+            entry = self._streams.get(session_id)
+            if entry is not None:
+                entry[0] = stream
+        if entry is None:
+            stream.stop(wait=False)  # sesi dihentikan/dibuang selagi sumber dibuka
+            return None
+        self._ensure_reaper()
+        return stream
+
+    def get(self, session_id):
+        """Stream sesi ini atau None; setiap panggilan dihitung sebagai heartbeat sesi."""
+        with self._lock:
+            entry = self._streams.get(session_id)
+            if entry is None or entry[0] is None:
+                return None
+            entry[1] = time.monotonic()
+            return entry[0]
+
+    def stop(self, session_id):
+        """Menghentikan stream sesi ini tanpa menunggu thread-nya (aman dipanggil dari callback eviksi)."""
+        with self._lock:
+            entry = self._streams.pop(session_id, None)
+        if entry is not None and entry[0] is not None:
+            entry[0].stop(wait=False)
+
+    def reap(self):
+        """Menghentikan stream tanpa heartbeat dalam `heartbeat_timeout` detik atau yang sudah selesai."""
+        now = time.monotonic()
+        with self._lock:
+            stale = [session_id for session_id, (stream, seen) in self._streams.items()
+                     if stream is not None and (now - seen > self.heartbeat_timeout or not stream.running)]
+        for session_id in stale:
+            self.stop(session_id)
+            self.reaped += 1
+            metrics.inc("streams_reaped")
+
+    def _ensure_reaper(self):
+        with self._lock:
+            if self._reaper is not None:
+                return
+
+            def loop():
+                while True:
+                    time.sleep(self.heartbeat_timeout / 2)
+                    self.reap()
+
+            self._reaper = threading.Thread(target=loop, name="stream-reaper", daemon=True)
+            self._reaper.start()
+
+    def stats(self):
+        with self._lock:
+            return {"streams": len(self._streams), "max_streams": self.max_streams, "reaped": self.reaped}
+
+
+def _is_live(source):
+    return str(source).isdigit() or "://" in str(source)
+
+
+def main(argv=None):
+    from model_handler import ModelHandler
+
+    parser = argparse.ArgumentParser(description="Klasifikasi kontinu dari kamera, RTSP, atau file video.")
+    parser.add_argument("source", help="Indeks kamera (mis. 0), URL stream, atau path file video")
+    parser.add_argument("--model", default=config.MODEL_PATH, help="Path file model")
+    parser.add_argument("--max-seconds", type=float, default=None)
+    parser.add_argument("--as-fast-as-possible", action="store_true",
+                        help="Untuk file video: jangan tahan ke fps asli")
+    args = parser.parse_args(argv)
+
+    handler = ModelHandler(args.model, slots=1)  # satu thread klasifikasi
+    handler.warmup()
+    stream = StreamClassifier(handler, args.source, realtime=False if args.as_fast_as_possible else None,
+                              on_result=lambda prediction, probabilities: print(
+                                  f"{prediction:<10} {max(probabilities.values()):.1%}"))
+    stream.start()
+    try:
+        deadline = time.perf_counter() + args.max_seconds if args.max_seconds else None
+        while stream.running and (deadline is None or time.perf_counter() < deadline):
+            time.sleep(5.0 if deadline is None else max(0.0, min(5.0, deadline - time.perf_counter())))
+            stats = stream.stats()
+            print(f"   > {stats['effective_fps']:.1f} fps efektif, forward {stats['forward_ms']:.0f} ms, "
+                  f"{stats['frames_skipped']} di-skip, {stats['frames_dropped']} di-drop")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.stop()
+    print(stream.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,8 @@ MODEL_PATH = "my_model.pkl"
 MODEL_ARCHITECTURE = "ResNet34"
 INPUT_SIZE = (224, 224)
 BATCH_SIZE = 32
+# Inference backend: "fastai", "torchscript", "weights" or "onnx" (empty = detect from file extension)
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "")
 
 # Waste Categories
 WASTE_CATEGORIES = [
@@ -46,7 +48,13 @@ CATEGORY_EMOJIS = {
 # File Upload Settings
 ALLOWED_EXTENSIONS = ['png', 'jpg', 'jpeg']
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB in bytes
-MAX_IMAGE_DIMENSION = 2048
+MAX_IMAGE_DIMENSION = 8192  # longest side in pixels, checked from the header before decoding
+MAX_IMAGE_PIXELS = 50_000_000  # decompression-bomb guard (also applied to PIL.Image.MAX_IMAGE_PIXELS)
+# Total memory that concurrent decodes in one process may reserve; further decodes wait
+DECODE_MEMORY_BUDGET = int(os.getenv("DECODE_MEMORY_BUDGET_MB", 512)) * 1024 * 1024
+DECODE_BUDGET_TIMEOUT = 30  # seconds to wait for budget before rejecting the image
+# Image decode backend (image_decode.py): "pil" (JPEG draft mode), "full" or "torchvision"
+DECODE_BACKEND = os.getenv("DECODE_BACKEND", "pil")
 
 # UI Colors
 COLORS = {
@@ -66,6 +74,12 @@ CONFIDENCE_THRESHOLDS = {
     "low": 0.4
 }
 
+# Model cascade: a small model answers first; images below the threshold go to MODEL_PATH
+CASCADE_CONFIG = {
+    "fast_model_path": os.getenv("FAST_MODEL_PATH", ""),  # empty = cascade disabled
+    "threshold": float(os.getenv("CASCADE_THRESHOLD", CONFIDENCE_THRESHOLDS["high"])),
+}
+
 # Performance Metrics (Demo Data)
 DEMO_METRICS = {
     "overall_accuracy": 0.952,
@@ -98,6 +112,13 @@ TRAINING_CONFIG = {
     }
 }
 
+# Quantization Configuration (quantization.py / ModelHandler.quantize)
+QUANTIZATION_CONFIG = {
+    "mode": "static",             # "static" (conv + linear) or "dynamic" (linear only)
+    "calibration_images": 200,    # images used to calibrate activation ranges
+    "min_agreement": 0.99,        # required top-1 agreement with the fp32 model
+}
+
 # Paths
 BASE_DIR = Path(__file__).parent
 MODEL_DIR = BASE_DIR / "models"
@@ -109,10 +130,54 @@ TEMP_DIR = BASE_DIR / "temp"
 for directory in [MODEL_DIR, DATA_DIR, STATIC_DIR, TEMP_DIR]:
     directory.mkdir(exist_ok=True)
 
+# Host-specific thread/batch profile written by autotune.py and read by ModelHandler
+AUTOTUNE_CONFIG = {
+    "profile_path": Path(os.getenv("INFERENCE_PROFILE", MODEL_DIR / "inference_profile.json")),
+    "latency_budget_ms": 250,  # p95 batch latency allowed when picking the best setting
+}
+
+# Evaluation artifact written by evaluate.py and shown on the analytics page
+EVALUATION_CONFIG = {
+    "artifact_path": Path(os.getenv("EVALUATION_ARTIFACT", DATA_DIR / "evaluation.json")),
+    "calibration_bins": 10,
+    # Per-image predictions keyed by (content hash, model fingerprint) for incremental re-runs
+    "store_path": Path(os.getenv("EVALUATION_STORE", DATA_DIR / "evaluation.sqlite")),
+}
+
 # Environment Variables
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 PORT = int(os.getenv("PORT", 8501))
 
+# Inference Server Configuration (inference_server.py)
+SERVER_CONFIG = {
+    "host": os.getenv("INFERENCE_HOST", "0.0.0.0"),
+    "port": PORT,
+    "max_batch_size": int(os.getenv("INFERENCE_MAX_BATCH", 16)),
+    "batch_window_ms": float(os.getenv("INFERENCE_BATCH_WINDOW_MS", 5)),
+}
+
+# Concurrent predict within one process (ModelHandler.slots)
+CONCURRENCY_CONFIG = {
+    # Forward passes allowed at once over ONE shared model (not model copies); extra callers queue
+    # and are counted in the metrics. Without an autotune profile, each forward gets cpu_count // slots
+    # intra-op threads so concurrent passes do not oversubscribe the cores.
+    "slots": int(os.getenv("INFERENCE_SLOTS", os.getenv("INFERENCE_REPLICAS", 2))),
+}
+
+# Pre-forked worker pool (worker_pool.py); 0 threads = cores divided evenly across workers
+WORKER_CONFIG = {
+    "workers": int(os.getenv("INFERENCE_WORKERS", 1)),
+    "threads_per_worker": int(os.getenv("INFERENCE_THREADS_PER_WORKER", 0)),
+    # Seconds to wait for a worker result before failing the request (0 = no limit)
+    "task_timeout": float(os.getenv("INFERENCE_TASK_TIMEOUT", 60)),
+}
+
+# Metrics Configuration (metrics.py); the sidebar debug panel is shown when DEBUG is true
+METRICS_CONFIG = {
+    "file": os.getenv("METRICS_FILE", ""),  # headless: periodically write Prometheus text here
+    "dump_interval": float(os.getenv("METRICS_DUMP_INTERVAL", 15)),
+}
+
 # Logging Configuration
 LOGGING_CONFIG = {
     "version": 1,
@@ -142,7 +207,36 @@ LOGGING_CONFIG = {
 CACHE_CONFIG = {
     "model_cache_ttl": 3600,  # 1 hour
     "data_cache_ttl": 1800,   # 30 minutes
-    "max_cache_entries": 100
+    "max_cache_entries": 100,
+    # SQLite file for persisting predictions; empty keeps the cache in memory only
+    "prediction_cache_path": os.getenv("PREDICTION_CACHE_PATH", ""),
+}
+
+# Continuous stream mode (camera_stream.py)
+STREAM_CONFIG = {
+    # Allow-list of sources the web UI may open (comma-separated): camera index, RTSP URL, or video file.
+    # Users only pick from this list; paths or URLs typed in the browser are never opened server-side.
+    "sources": [source.strip() for source in os.getenv("STREAM_SOURCES", "0").split(",") if source.strip()],
+    "default_fps": 30.0,        # used when the source does not report its frame rate
+    "max_streams": int(os.getenv("STREAM_MAX_CONCURRENT", 2)),  # live streams across all sessions
+    # Seconds without a page poll before a session's stream is stopped (tab closed or navigated away)
+    "heartbeat_timeout": float(os.getenv("STREAM_HEARTBEAT_TIMEOUT", 10)),
+    "latency_smoothing": 0.2,   # EMA weight of the newest forward latency sample
+}
+
+# Per-session state kept by the Streamlit app (session_store.py)
+SESSION_CONFIG = {
+    "memory_budget_mb": int(os.getenv("SESSION_MEMORY_BUDGET_MB", 64)),  # all sessions together
+    "idle_ttl": int(os.getenv("SESSION_IDLE_TTL", 900)),  # seconds before an idle session is evicted
+}
+
+# Near-duplicate index (phash_index.py): reuse results for frames whose dHash differs by few bits.
+# Opt-in and scoped to one session's camera snapshots, since two different items can share a dHash.
+PHASH_CONFIG = {
+    "enabled": os.getenv("PHASH_DEDUP", "False").lower() == "true",
+    "max_distance": int(os.getenv("PHASH_MAX_DISTANCE", 6)),  # Hamming distance out of 64 bits
+    "max_entries": 256,
+    "ttl": 60,  # seconds; a new item on the belt should not inherit an old result for long
 }
 
 # Error Messages
@@ -150,6 +244,12 @@ ERROR_MESSAGES = {
     "model_not_found": "Model file not found. Please ensure 'my_model.pkl' is in the correct directory.",
     "invalid_image": "Invalid image file. Please upload a valid PNG, JPG, or JPEG image.",
     "file_too_large": f"File too large. Maximum size allowed is {MAX_FILE_SIZE // (1024*1024)}MB.",
+    "image_too_large": f"Image dimensions too large. Maximum is {MAX_IMAGE_DIMENSION}px per side "
+                       f"and {MAX_IMAGE_PIXELS // 1_000_000} megapixels.",
+    "server_busy": "Too many images are being processed right now. Please try again.",
+    "session_expired": "This image was cleared from memory while it was being classified. "
+                       "Please upload it again.",
+    "too_many_streams": "Too many live streams are running right now. Please try again later.",
     "prediction_error": "Error occurred during prediction. Please try again.",
     "upload_error": "Error uploading file. Please try again."
 }
@@ -0,0 +1,258 @@
+# =============================================================================
+# FILE: eval_store.py
+# DESKRIPSI: Penyimpanan hasil evaluasi per gambar di SQLite, dengan kunci
+#            (hash konten gambar, sidik jari model). Evaluasi ulang hanya
+#            menjalankan inferensi untuk gambar baru atau model baru; metrik
+#            agregat dihitung ulang dari baris yang tersimpan.
+#
+# Contoh:
+#   python eval_store.py data/test                 # evaluasi inkremental
+#   python eval_store.py data/test --model baru.pkl
+# =============================================================================
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+import config
+from batch_classify import iter_labeled_images, predict_items
+from evaluate import StreamingMetrics, save_report
+from model_handler import ModelHandler
+from prediction_cache import model_fingerprint
+
+
+def content_hash(path, chunk_size=1 << 20):
+    """SHA-256 dari byte file gambar (bukan path), agar file yang dipindah tetap dikenali."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EvaluationStore:
+    """
+    Tabel:
+      files       path -> (ukuran, mtime, hash konten); hash tidak dihitung
+                  ulang selama ukuran dan mtime file tidak berubah
+      models      sidik jari -> nama kelas (urutan kolom probabilitas)
+      predictions (hash konten, sidik jari) -> probabilitas float32
+      decode_failures hash konten -> pesan error; file yang tidak bisa
+                  di-decode tidak dicoba ulang (dan tidak memaksa model dimuat)
+      run_images  (sementara) path -> label dan hash konten gambar run ini;
+                  berkunci path agar salinan identik tetap dihitung per file
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.EVALUATION_CONFIG["store_path"]
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._db = sqlite3.connect(self.db_path)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " content_hash TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS models ("
+            " fingerprint TEXT PRIMARY KEY, class_names TEXT NOT NULL,"
+            " model_path TEXT, created REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " content_hash TEXT NOT NULL, fingerprint TEXT NOT NULL, probs BLOB NOT NULL,"
+            " created REAL NOT NULL, PRIMARY KEY (content_hash, fingerprint));"
+            "CREATE TABLE IF NOT EXISTS decode_failures ("
+            " content_hash TEXT PRIMARY KEY, error TEXT NOT NULL, created REAL NOT NULL);"
+            # Himpunan gambar berlabel pada run ini; hanya hidup selama koneksi
+            "CREATE TEMP TABLE IF NOT EXISTS run_images ("
+            " path TEXT PRIMARY KEY, label INTEGER NOT NULL, content_hash TEXT NOT NULL);"
+        )
+        self._db.commit()
+
+    def file_hash(self, path):
+        """Hash konten dengan cache berbasis (ukuran, mtime) dari tabel `files`."""
+        stat = os.stat(path)
+        row = self._db.execute(
+            "SELECT size, mtime_ns, content_hash FROM files WHERE path = ?", (path,)
+        ).fetchone()
+        if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = content_hash(path)
+        self._db.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, digest),
+        )
+        return digest
+
+    def class_names(self, fingerprint):
+        row = self._db.execute(
+            "SELECT class_names FROM models WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def register_model(self, fingerprint, class_names, model_path=None):
+        self._db.execute(
+            "INSERT OR IGNORE INTO models (fingerprint, class_names, model_path, created)"
+            " VALUES (?, ?, ?, ?)",
+            (fingerprint, json.dumps(list(class_names)), model_path, time.time()),
+        )
+        self._db.commit()
+
+    def begin_run(self):
+        self._db.execute("DELETE FROM run_images")
+
+    def add_run_image(self, digest, label, path):
+        self._db.execute(
+            "INSERT OR REPLACE INTO run_images (path, label, content_hash) VALUES (?, ?, ?)",
+            (path, label, digest),
+        )
+
+    def missing(self, fingerprint):
+        """
+        Konten gambar pada run ini yang belum punya prediksi untuk model
+        `fingerprint` (satu baris per hash konten) dan belum pernah gagal di-decode.
+        """
+        return self._db.execute(
+            "SELECT MIN(r.path), MIN(r.label), r.content_hash FROM run_images r"
+            " LEFT JOIN predictions p ON p.content_hash = r.content_hash AND p.fingerprint = ?"
+            " LEFT JOIN decode_failures f ON f.content_hash = r.content_hash"
+            " WHERE p.content_hash IS NULL AND f.content_hash IS NULL"
+            " GROUP BY r.content_hash ORDER BY 1",
+            (fingerprint,),
+        ).fetchall()
+
+    def add_failures(self, failures):
+        """Mencatat `(hash konten, pesan error)` gambar yang gagal di-decode."""
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO decode_failures (content_hash, error, created) VALUES (?, ?, ?)",
+            [(digest, error, now) for digest, error in failures],
+        )
+        self._db.commit()
+
+    def failed_count(self):
+        """Jumlah file pada run ini yang dilewati karena gagal di-decode."""
+        return self._db.execute(
+            "SELECT COUNT(*) FROM run_images r JOIN decode_failures f ON f.content_hash = r.content_hash"
+        ).fetchone()[0]
+
+    def add_predictions(self, fingerprint, hashes, probs):
+        now = time.time()
+        probs = np.asarray(probs, dtype=np.float32)
+        self._db.executemany(
+            "INSERT OR REPLACE INTO predictions (content_hash, fingerprint, probs, created)"
+            " VALUES (?, ?, ?, ?)",
+            [(digest, fingerprint, row.tobytes(), now) for digest, row in zip(hashes, probs)],
+        )
+        self._db.commit()
+
+    def aggregate(self, fingerprint, class_names, chunk_size=4096):
+        """Menghitung metrik dari prediksi tersimpan untuk gambar pada run ini."""
+        accumulator = StreamingMetrics([name.capitalize() for name in class_names])
+        cursor = self._db.execute(
+            "SELECT r.label, p.probs FROM run_images r"
+            " JOIN predictions p ON p.content_hash = r.content_hash AND p.fingerprint = ?",
+            (fingerprint,),
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            labels = [label for label, _ in rows]
+            probs = np.frombuffer(b"".join(blob for _, blob in rows), dtype=np.float32)
+            accumulator.update(labels, probs.reshape(len(rows), -1))
+        return accumulator.report()
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+def _load_handler(model_path):
+    handler = ModelHandler(model_path, use_cache=False, slots=1)
+    if not handler.is_model_loaded():
+        # Prediksi acak cadangan tidak boleh tersimpan permanen di bawah sidik jari model ini
+        raise RuntimeError(f"Model tidak dapat dimuat dari {model_path}; evaluasi dibatalkan.")
+    return handler
+
+
+def evaluate_incremental(root, model_path=config.MODEL_PATH, store=None, workers=None,
+                         batch_size=config.BATCH_SIZE):
+    """
+    Seperti `evaluate.evaluate_folder`, tetapi hanya gambar yang belum punya
+    prediksi untuk model ini yang di-decode dan di-inferensi. Model tidak
+    dimuat sama sekali jika semua prediksi sudah tersimpan.
+    """
+    store = store or EvaluationStore()
+    fingerprint = model_fingerprint(model_path)
+    handler = None
+    class_names = store.class_names(fingerprint)
+    if class_names is None:
+        handler = _load_handler(model_path)
+        class_names = list(handler.waste_types)
+        store.register_model(fingerprint, class_names, str(model_path))
+
+    store.begin_run()
+    seen = 0
+    for path, label in iter_labeled_images(root, class_names):
+        store.add_run_image(store.file_hash(path), label, path)
+        seen += 1
+    store.commit()
+
+    missing = store.missing(fingerprint)
+    print(f"{seen} gambar berlabel, {len(missing)} perlu inferensi untuk model ini.", file=sys.stderr)
+    inferred = 0
+    if missing:
+        handler = handler or _load_handler(model_path)
+        done = 0
+        for batch, probs, errors in predict_items(handler, missing, workers, batch_size):
+            decoded = [(digest, row) for (_, _, digest), row in zip(batch, probs) if row is not None]
+            # Gagal decode dicatat per hash konten: tidak dicoba lagi sampai isi file berubah
+            store.add_failures([(digest, error) for (_, _, digest), error in zip(batch, errors)
+                                if error is not None])
+            inferred += len(decoded)
+            if decoded:
+                # Disimpan per batch, jadi run yang terhenti bisa dilanjutkan
+                store.add_predictions(fingerprint, [digest for digest, _ in decoded],
+                                      [row for _, row in decoded])
+                done += len(decoded)
+                print(f"\r   > {done}/{len(missing)} gambar", end="", file=sys.stderr)
+        print(file=sys.stderr)
+
+    report = store.aggregate(fingerprint, class_names)
+    report["skipped"] = store.failed_count()
+    report["newly_inferred"] = inferred
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluasi inkremental dengan penyimpanan per gambar.")
+    parser.add_argument("root", help="Folder berlabel; nama subfolder = nama kelas")
+    parser.add_argument("--model", default=config.MODEL_PATH, help="Path file model")
+    parser.add_argument("--store", default=str(config.EVALUATION_CONFIG["store_path"]))
+    parser.add_argument("--output", default=str(config.EVALUATION_CONFIG["artifact_path"]))
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses decode")
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    store = EvaluationStore(args.store)
+    try:
+        report = evaluate_incremental(args.root, args.model, store, args.workers, args.batch_size)
+    finally:
+        store.close()
+    if report["n_images"] == 0:
+        raise SystemExit(f"Tidak ada gambar berlabel di {args.root}")
+    save_report(report, args.output, model=str(args.model), dataset=os.path.abspath(args.root))
+
+    print(f"Akurasi {report['overall_accuracy']:.2%}, F1 makro {report['overall_f1']:.2%}, "
+          f"ECE {report['calibration']['ece']:.3f} ({report['n_images']} gambar, "
+          f"{report['newly_inferred']} baru diinferensi, {report['skipped']} dilewati)")
+    print(f"✅ Laporan evaluasi disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# =============================================================================
+# FILE: evaluate.py
+# DESKRIPSI: Evaluasi model pada folder berlabel (`root/<kelas>/...`).
+#            Gambar dialirkan per batch: decode di process pool, forward
+#            di-batch, lalu confusion matrix, presisi/recall/F1 per kelas, dan
+#            histogram kalibrasi diakumulasi secara inkremental. Memori tetap
+#            konstan berapa pun ukuran dataset. Hasil disimpan sebagai JSON
+#            yang dibaca halaman Model Analytics.
+#
+# Contoh:
+#   python evaluate.py data/test
+#   python evaluate.py data/test --batch-size 64 --workers 8 --output hasil_eval.json
+# =============================================================================
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import config
+from batch_classify import iter_labeled_images, predict_items
+from model_handler import ModelHandler
+
+
+class StreamingMetrics:
+    """
+    Akumulator metrik klasifikasi. `update` hanya menambah counter berukuran
+    tetap (n_kelas x n_kelas dan n_bin), jadi batch bisa langsung dibuang.
+    """
+
+    def __init__(self, class_names, n_bins=config.EVALUATION_CONFIG["calibration_bins"]):
+        self.class_names = list(class_names)
+        self.n_bins = n_bins
+        n = len(self.class_names)
+        self.confusion = np.zeros((n, n), dtype=np.int64)      # baris = label, kolom = prediksi
+        self.bin_count = np.zeros(n_bins, dtype=np.int64)
+        self.bin_confidence = np.zeros(n_bins, dtype=np.float64)
+        self.bin_correct = np.zeros(n_bins, dtype=np.float64)
+        self.nll_sum = 0.0
+
+    def update(self, labels, probs):
+        labels = np.asarray(labels, dtype=np.int64)
+        probs = np.asarray(probs, dtype=np.float64)
+        n = len(self.class_names)
+        rows = np.arange(len(labels))
+        preds = probs.argmax(axis=1)
+
+        self.confusion += np.bincount(labels * n + preds, minlength=n * n).reshape(n, n)
+
+        confidence = probs[rows, preds]
+        bins = np.minimum((confidence * self.n_bins).astype(np.int64), self.n_bins - 1)
+        self.bin_count += np.bincount(bins, minlength=self.n_bins)
+        self.bin_confidence += np.bincount(bins, weights=confidence, minlength=self.n_bins)
+        self.bin_correct += np.bincount(bins, weights=(preds == labels), minlength=self.n_bins)
+
+        self.nll_sum += float(-np.log(np.clip(probs[rows, labels], 1e-12, None)).sum())
+
+    @property
+    def n_images(self):
+        return int(self.confusion.sum())
+
+    def report(self):
+        """Ringkasan dalam bentuk yang sama dengan `config.DEMO_METRICS` plus detailnya."""
+        tp = np.diag(self.confusion).astype(np.float64)
+        support = self.confusion.sum(axis=1)
+        predicted = self.confusion.sum(axis=0)
+        precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+        recall = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+        denom = precision + recall
+        f1 = np.divide(2 * precision * recall, denom, out=np.zeros_like(tp), where=denom > 0)
+
+        n = self.n_images
+        edges = np.linspace(0.0, 1.0, self.n_bins + 1)
+        mean_conf = np.divide(self.bin_confidence, self.bin_count,
+                              out=np.zeros(self.n_bins), where=self.bin_count > 0)
+        accuracy_in_bin = np.divide(self.bin_correct, self.bin_count,
+                                    out=np.zeros(self.n_bins), where=self.bin_count > 0)
+        ece = float(np.sum(self.bin_count * np.abs(mean_conf - accuracy_in_bin)) / n) if n else 0.0
+
+        return {
+            "n_images": n,
+            "overall_accuracy": float(tp.sum() / n) if n else 0.0,
+            "overall_precision": float(precision.mean()),
+            "overall_recall": float(recall.mean()),
+            "overall_f1": float(f1.mean()),
+            "log_loss": self.nll_sum / n if n else 0.0,
+            "class_names": self.class_names,
+            "class_metrics": {
+                name.lower(): {"precision": float(p), "recall": float(r), "f1": float(f), "support": int(s)}
+                for name, p, r, f, s in zip(self.class_names, precision, recall, f1, support)
+            },
+            "confusion_matrix": self.confusion.tolist(),
+            "calibration": {
+                "ece": ece,
+                "bins": [
+                    {"lower": float(lo), "upper": float(hi), "count": int(c),
+                     "confidence": float(mc), "accuracy": float(acc)}
+                    for lo, hi, c, mc, acc in zip(edges[:-1], edges[1:], self.bin_count,
+                                                  mean_conf, accuracy_in_bin)
+                ],
+            },
+        }
+
+
+def evaluate_folder(root, model_path=config.MODEL_PATH, workers=None, batch_size=config.BATCH_SIZE,
+                    handler=None):
+    """Mengevaluasi seluruh folder berlabel dan mengembalikan laporan (dict)."""
+    handler = handler or ModelHandler(model_path, use_cache=False, slots=1)
+    if not handler.is_model_loaded():
+        # Prediksi acak cadangan tidak boleh menjadi laporan evaluasi
+        raise RuntimeError(f"Model tidak dapat dimuat dari {model_path}; evaluasi dibatalkan.")
+    class_names = [name.capitalize() for name in handler.waste_types]
+    accumulator = StreamingMetrics(class_names)
+    skipped = 0
+
+    items = iter_labeled_images(root, handler.waste_types)
+    for batch, probs, _ in predict_items(handler, items, workers, batch_size):
+        decoded = [(label, row) for (_, label), row in zip(batch, probs) if row is not None]
+        skipped += len(batch) - len(decoded)
+        if decoded:
+            accumulator.update([label for label, _ in decoded], np.stack([row for _, row in decoded]))
+            print(f"\r   > {accumulator.n_images} gambar", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+    report = accumulator.report()
+    report["skipped"] = skipped
+    return report
+
+
+def save_report(report, path=None, **meta):
+    """Simpan laporan secara atomik bersama metadata run (model, waktu, dataset)."""
+    path = path or config.EVALUATION_CONFIG["artifact_path"]
+    report = {**report, "meta": {"created": time.strftime("%Y-%m-%d %H:%M:%S"), **meta}}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_report(path=None):
+    """Membaca laporan evaluasi terakhir; None jika belum pernah dijalankan."""
+    path = path or config.EVALUATION_CONFIG["artifact_path"]
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluasi model pada folder berlabel (root/<kelas>/...).")
+    parser.add_argument("root", help="Folder berlabel; nama subfolder = nama kelas")
+    parser.add_argument("--model", default=config.MODEL_PATH, help="Path file model")
+    parser.add_argument("--output", default=str(config.EVALUATION_CONFIG["artifact_path"]))
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses decode")
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_SIZE)
+    parser.add_argument("--fast-model", default=None,
+                        help="Evaluasi mode kaskade dengan model cepat ini di depan --model")
+    args = parser.parse_args(argv)
+
+    handler = ModelHandler(args.model, use_cache=False, fast_model_path=args.fast_model, slots=1)
+    if not handler.is_model_loaded():
+        raise SystemExit(f"Model tidak dapat dimuat dari {args.model}")
+    report = evaluate_folder(args.root, args.model, args.workers, args.batch_size, handler=handler)
+    if handler.fast is not None:
+        report["cascade"] = handler.cascade_stats()
+    if report["n_images"] == 0:
+        raise SystemExit(f"Tidak ada gambar berlabel di {args.root}")
+    save_report(report, args.output, model=str(args.model), dataset=os.path.abspath(args.root))
+
+    print(f"Akurasi {report['overall_accuracy']:.2%}, F1 makro {report['overall_f1']:.2%}, "
+          f"ECE {report['calibration']['ece']:.3f} ({report['n_images']} gambar, "
+          f"{report['skipped']} dilewati)")
+    for name, m in report["class_metrics"].items():
+        print(f"   {name:<10} P {m['precision']:.2%}  R {m['recall']:.2%}  F1 {m['f1']:.2%}  n={m['support']}")
+    if "cascade" in report:
+        cascade = report["cascade"]
+        print(f"Kaskade: {cascade['fast_hit_rate']:.1%} dijawab model cepat, "
+              f"{cascade['fast_ms_per_image']:.1f} / {cascade['full_ms_per_image']:.1f} ms per gambar")
+    print(f"✅ Laporan evaluasi disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
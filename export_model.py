@@ -0,0 +1,126 @@
+# =============================================================================
+# FILE: export_model.py
+# DESKRIPSI: Mengekspor Learner FastAI (`my_model.pkl`) menjadi artefak ONNX,
+#            TorchScript, atau bobot saja (memory-mapped). Normalisasi dan softmax ikut diekspor, sehingga
+#            artefak menerima batch uint8 (N, H, W, 3) secara langsung.
+#            Manifest JSON (vocab, ukuran input, SHA-256) ditulis di samping artefak.
+#
+# Contoh:
+#   python export_model.py --format onnx --output models/my_model.onnx
+#   python export_model.py --format torchscript --output models/my_model.pt
+#   python export_model.py --format weights --output models/my_model.weights
+#   MODEL_BACKEND=onnx streamlit run streamlit_app.py   (dengan MODEL_PATH yang sesuai)
+# =============================================================================
+
+import argparse
+import inspect
+import json
+import os
+
+import torch
+
+import config
+import inference_net
+from model_handler import ModelHandler
+from prediction_cache import file_sha256
+
+
+# Format ekspor -> ekstensi default (dikenali `model_handler.detect_backend`)
+EXTENSIONS = {
+    "onnx": ".onnx",
+    "torchscript": ".pt",
+    "weights": ".weights",
+}
+
+
+def _example_input(batch_size=1):
+    width, height = config.INPUT_SIZE
+    return torch.zeros((batch_size, height, width, 3), dtype=torch.uint8)
+
+
+def write_manifest(output_path, vocab, fmt, **extra):
+    """
+    Menulis manifest `<artefak>.json` yang dibaca `model_handler.load_manifest`.
+    SHA-256 artefak ikut disimpan sebagai sidik jari model (lihat
+    `prediction_cache.model_fingerprint`).
+    """
+    manifest = {
+        "format": fmt,
+        "sha256": file_sha256(output_path),
+        "vocab": [str(v) for v in vocab],
+        "input_size": list(config.INPUT_SIZE),
+        "input_layout": "NHWC",
+        "input_dtype": "uint8",
+        "output": "probabilities",
+        **extra,
+    }
+    manifest_path = f"{output_path}.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
+def export_onnx(net, output_path, opset=17):
+    """Ekspor ke ONNX dengan dimensi batch dinamis."""
+    extra = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # PyTorch terbaru default ke exporter dynamo yang butuh paket onnxscript;
+        # exporter TorchScript cukup untuk graf ini dan mendukung `dynamic_axes`
+        extra["dynamo"] = False
+    torch.onnx.export(
+        net,
+        _example_input(),
+        output_path,
+        input_names=["image"],
+        output_names=["probabilities"],
+        dynamic_axes={"image": {0: "batch"}, "probabilities": {0: "batch"}},
+        opset_version=opset,
+        **extra,
+    )
+
+
+def export_torchscript(net, output_path):
+    """Ekspor ke TorchScript lewat tracing."""
+    with torch.no_grad():
+        traced = torch.jit.trace(net, _example_input())
+    traced = torch.jit.freeze(traced)
+    traced.save(output_path)
+
+
+def export(model_path, output_path, fmt="onnx", arch=None):
+    """Memuat Learner lewat `ModelHandler` lalu mengekspornya ke format `fmt`."""
+    handler = ModelHandler(model_path, use_cache=False, backend="fastai")
+    if handler.model is None:
+        raise RuntimeError("Learner FastAI tidak berhasil dimuat; ekspor dibatalkan.")
+
+    net = inference_net.from_learner(handler.model).cpu()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    if fmt == "onnx":
+        export_onnx(net, output_path)
+    elif fmt == "torchscript":
+        export_torchscript(net, output_path)
+    elif fmt == "weights":
+        # Bobot saja untuk backend "weights" (memory-mapped, tanpa fastai)
+        arch = arch or config.MODEL_ARCHITECTURE.lower()
+        tensors = inference_net.save_weights(net, output_path)
+        return write_manifest(output_path, handler.waste_types, fmt, arch=arch, tensors=tensors)
+    else:
+        raise ValueError(f"Format tidak dikenal: {fmt}")
+    return write_manifest(output_path, handler.waste_types, fmt)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor model FastAI ke ONNX / TorchScript.")
+    parser.add_argument("--model", default=config.MODEL_PATH, help="Path Learner FastAI (.pkl)")
+    parser.add_argument("--format", choices=list(EXTENSIONS), default="onnx")
+    parser.add_argument("--arch", default=None, help="Arsitektur torchvision (format weights), mis. resnet34")
+    parser.add_argument("--output", default=None, help="Path artefak hasil ekspor")
+    args = parser.parse_args(argv)
+
+    output = args.output or str(config.MODEL_DIR / f"my_model{EXTENSIONS[args.format]}")
+    manifest_path = export(args.model, output, args.format, args.arch)
+    print(f"✅ Model diekspor ke {output} (manifest: {manifest_path})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# =============================================================================
+# FILE: image_decode.py
+# DESKRIPSI: Lapisan decode gambar dengan backend yang bisa diganti.
+#            Backend "pil" memakai draft mode JPEG sehingga foto besar
+#            (mis. 12 MP dari ponsel) langsung di-decode mendekati ukuran
+#            input model, bukan di resolusi penuh.
+#
+# Contoh benchmark:
+#   python image_decode.py folder_foto/ --repeat 3
+# =============================================================================
+
+import argparse
+import io
+import itertools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+import config
+import metrics
+from preprocessing import prepare_image
+
+# PIL sendiri menolak gambar di atas 2x batas ini (DecompressionBombError)
+Image.MAX_IMAGE_PIXELS = config.MAX_IMAGE_PIXELS
+
+# Nama backend -> fungsi(data: bytes, target_size) -> PIL.Image (RGB)
+DECODE_BACKENDS = {}
+
+
+def register_backend(name):
+    """Dekorator untuk mendaftarkan backend decode baru."""
+    def decorator(func):
+        DECODE_BACKENDS[name] = func
+        return func
+    return decorator
+
+
+@register_backend("pil")
+def decode_pil(data, target_size=config.INPUT_SIZE):
+    """
+    Decode dengan PIL. Untuk JPEG, `draft` memilih skala DCT (1/2, 1/4, 1/8)
+    terbesar yang hasilnya masih >= `target_size` di kedua sisi, sehingga
+    crop tengah + resize setelahnya tidak kehilangan resolusi yang dibutuhkan.
+    """
+    image = Image.open(io.BytesIO(data))
+    if image.format == "JPEG" and target_size:
+        image.draft("RGB", target_size)
+    image.load()
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+@register_backend("full")
+def decode_full(data, target_size=None):
+    """Decode PIL di resolusi penuh (perilaku lama), untuk pembanding."""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+@register_backend("torchvision")
+def decode_torchvision(data, target_size=None):
+    """Decode dengan `torchvision.io` (libjpeg-turbo/libpng bawaan torchvision)."""
+    import torch
+    from torchvision.io import ImageReadMode, decode_image
+
+    tensor = decode_image(torch.frombuffer(bytearray(data), dtype=torch.uint8), mode=ImageReadMode.RGB)
+    return Image.fromarray(tensor.permute(1, 2, 0).numpy())
+
+
+def read_header(data):
+    """(format, mode, (lebar, tinggi)) dari header saja; data piksel belum dibaca."""
+    with Image.open(io.BytesIO(data)) as image:
+        return image.format, image.mode, image.size
+
+
+def check_dimensions(size):
+    """Melempar ValueError jika dimensi melebihi `MAX_IMAGE_DIMENSION` / `MAX_IMAGE_PIXELS`."""
+    width, height = size
+    if max(width, height) > config.MAX_IMAGE_DIMENSION or width * height > config.MAX_IMAGE_PIXELS:
+        raise ValueError(f"{config.ERROR_MESSAGES['image_too_large']} ({width}x{height})")
+
+
+def estimate_decode_bytes(fmt, mode, size, target_size=None):
+    """
+    Perkiraan memori puncak decode dalam byte: buffer piksel hasil decode
+    (untuk JPEG dengan draft, pada skala DCT yang akan dipilih PIL) ditambah
+    salinan RGB jika mode aslinya bukan RGB.
+    """
+    width, height = size
+    if fmt == "JPEG" and target_size:
+        # Aturan pemilihan skala yang sama dengan `JpegImageFile.draft`
+        scale = min(width // target_size[0], height // target_size[1])
+        for factor in (8, 4, 2, 1):
+            if scale >= factor:
+                width, height = -(-width // factor), -(-height // factor)
+                break
+    # PIL menyimpan mode multi-band (termasuk RGB) dengan 4 byte per piksel
+    pixels = width * height
+    per_pixel = 1 if mode in ("1", "L", "P") else 4
+    return pixels * per_pixel + (0 if mode == "RGB" else pixels * 4)
+
+
+class DecodeBudget:
+    """
+    Batas memori decode yang berjalan bersamaan dalam satu proses. Decode
+    yang reservasinya tidak muat menunggu sampai decode lain selesai; satu
+    decode yang lebih besar dari seluruh budget tetap boleh berjalan sendirian.
+    """
+
+    def __init__(self, budget_bytes, timeout=None):
+        self.budget = budget_bytes
+        self.timeout = timeout
+        self.in_use = 0
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes):
+        """Memesan `nbytes`; waktu menunggu dicatat sebagai tahap "decode_wait", terpisah dari decode."""
+        start = time.perf_counter()
+        with self._cond:
+            fits = lambda: self.in_use == 0 or self.in_use + nbytes <= self.budget
+            acquired = self._cond.wait_for(fits, self.timeout)
+            metrics.REGISTRY.observe("decode_wait", time.perf_counter() - start)
+            if not acquired:
+                raise ValueError(config.ERROR_MESSAGES["server_busy"])
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_use -= nbytes
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {"budget_mb": self.budget / 2**20, "in_use_mb": self.in_use / 2**20,
+                    "peak_mb": self.peak / 2**20}
+
+
+DECODE_BUDGET = DecodeBudget(config.DECODE_MEMORY_BUDGET, config.DECODE_BUDGET_TIMEOUT)
+
+
+def decode(data, backend=None, target_size=config.INPUT_SIZE):
+    """
+    Decode byte gambar menjadi PIL.Image RGB dengan backend terpilih. Dimensi
+    diperiksa dari header sebelum buffer piksel dialokasikan, dan decode
+    memesan perkiraan memorinya dari `DECODE_BUDGET`.
+    """
+    backend = backend or config.DECODE_BACKEND
+    try:
+        func = DECODE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Backend decode tidak dikenal: {backend}") from None
+    fmt, mode, size = read_header(data)
+    check_dimensions(size)
+    estimate = estimate_decode_bytes(fmt, mode, size, target_size if backend == "pil" else None)
+    # Antrean budget tidak ikut dihitung sebagai "decode", agar beban tidak terlihat seperti decode lambat
+    with DECODE_BUDGET.reserve(estimate), metrics.timed("decode"):
+        return func(data, target_size)
+
+
+def decode_for_model(data, backend=None, size=config.INPUT_SIZE):
+    """Decode lalu siapkan sebagai array uint8 (H, W, 3) siap-model."""
+    return prepare_image(decode(data, backend, size), size)
+
+
+def benchmark(paths, backends=None, repeat=3):
+    """
+    Mengukur waktu decode + persiapan ke ukuran input model per backend.
+    Mengembalikan dict backend -> statistik (ms rata-rata, p95, jumlah piksel
+    hasil decode rata-rata sebagai indikasi memori puncak).
+    """
+    backends = backends or list(DECODE_BACKENDS)
+    blobs = []
+    for path in paths:
+        with open(path, "rb") as f:
+            blobs.append(f.read())
+
+    results = {}
+    for backend in backends:
+        timings, pixels = [], []
+        try:
+            for _ in range(repeat):
+                for data in blobs:
+                    start = time.perf_counter()
+                    image = decode(data, backend)
+                    prepare_image(image)
+                    timings.append(time.perf_counter() - start)
+                    pixels.append(image.size[0] * image.size[1])
+        except Exception as e:
+            results[backend] = {"error": str(e)}
+            continue
+        timings = np.asarray(timings) * 1000.0
+        results[backend] = {
+            "ms_mean": float(timings.mean()),
+            "ms_p95": float(np.percentile(timings, 95)),
+            "decoded_pixels_mean": float(np.mean(pixels)),
+        }
+    return results
+
+
+def main(argv=None):
+    from batch_classify import iter_image_paths
+
+    parser = argparse.ArgumentParser(description="Benchmark backend decode gambar.")
+    parser.add_argument("root", help="Folder berisi gambar contoh")
+    parser.add_argument("--limit", type=int, default=50, help="Jumlah gambar maksimal")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--backends", nargs="*", default=None, choices=list(DECODE_BACKENDS))
+    args = parser.parse_args(argv)
+
+    paths = list(itertools.islice(iter_image_paths(args.root), args.limit))
+    results = benchmark(paths, args.backends, args.repeat)
+    print(json.dumps(results, indent=2))
+
+    timed = {name: r["ms_mean"] for name, r in results.items() if "ms_mean" in r}
+    if timed:
+        best = min(timed, key=timed.get)
+        print(f"Backend tercepat: {best} ({timed[best]:.2f} ms/gambar). "
+              f"Gunakan DECODE_BACKEND={best}")
+
+
+if __name__ == "__main__":
+    main()
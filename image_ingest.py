@@ -0,0 +1,132 @@
+# =============================================================================
+# FILE: image_ingest.py
+# DESKRIPSI: Objek unggahan gambar yang membaca byte sekali, memvalidasi
+#            header secara murah, dan men-decode secara lazy satu kali saja.
+#            Hasil decode yang sama dipakai untuk validasi, info gambar,
+#            thumbnail tampilan, dan input model.
+# =============================================================================
+
+import io
+
+from PIL import Image
+
+import config
+import image_decode
+import metrics
+from preprocessing import prepare_image
+
+# Ukuran maksimum thumbnail untuk ditampilkan di halaman (lihat utils.resize_image)
+DISPLAY_SIZE = (800, 600)
+
+# Tanda tangan byte awal (magic number) format yang didukung
+SIGNATURES = {
+    b"\xff\xd8\xff": "JPEG",
+    b"\x89PNG\r\n\x1a\n": "PNG",
+}
+
+
+def sniff_format(data):
+    """Menentukan format dari byte awal tanpa men-decode gambar."""
+    for signature, fmt in SIGNATURES.items():
+        if data.startswith(signature):
+            return fmt
+    return None
+
+
+class ImageUpload:
+    """
+    Satu unggahan gambar. Byte dibaca sekali saat dibuat; decode baru terjadi
+    saat `image`, `thumbnail()` atau `model_array` pertama kali diakses.
+    """
+
+    def __init__(self, data, name=None):
+        self.data = data
+        self.name = name
+        self.format = sniff_format(data)
+        self._image = None
+        self._thumbnail = None
+        self._model_array = None
+        self._header_size = None
+
+    @classmethod
+    def from_file(cls, file):
+        """Membuat dari `UploadedFile` Streamlit atau objek file biasa."""
+        if hasattr(file, "getvalue"):
+            data = file.getvalue()
+        else:
+            file.seek(0)
+            data = file.read()
+        return cls(data, getattr(file, "name", None))
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+    @property
+    def header_size(self):
+        """Dimensi asli (lebar, tinggi) dibaca dari header saja, tanpa decode piksel."""
+        if self._header_size is None:
+            with Image.open(io.BytesIO(self.data)) as image:
+                self._header_size = image.size
+        return self._header_size
+
+    def validate(self):
+        """Validasi murah: ukuran file, format, dan dimensi dari header. Mengembalikan (ok, pesan)."""
+        with metrics.timed("validation"):
+            return self._validate()
+
+    def _validate(self):
+        if not self.data:
+            return False, "No image uploaded"
+        if self.nbytes > config.MAX_FILE_SIZE:
+            return False, config.ERROR_MESSAGES["file_too_large"]
+        if self.format is None:
+            return False, config.ERROR_MESSAGES["invalid_image"]
+        try:
+            size = self.header_size
+        except Exception as e:
+            return False, f"Invalid image: {str(e)}"
+        # Gambar terlalu besar ditolak dari header, sebelum buffer piksel dialokasikan
+        try:
+            image_decode.check_dimensions(size)
+        except ValueError as e:
+            return False, str(e)
+        return True, "Valid image"
+
+    @property
+    def image(self):
+        """
+        Gambar RGB hasil decode (sekali saja). JPEG di-decode dengan draft mode
+        pada skala yang masih mencakup thumbnail tampilan dan input model.
+        """
+        if self._image is None:
+            target = (max(DISPLAY_SIZE[0], config.INPUT_SIZE[0]), max(DISPLAY_SIZE[1], config.INPUT_SIZE[1]))
+            self._image = image_decode.decode(self.data, target_size=target)
+        return self._image
+
+    def thumbnail(self, max_size=DISPLAY_SIZE):
+        """Salinan kecil untuk `st.image`, dibuat sekali dari hasil decode yang sama."""
+        if self._thumbnail is None:
+            thumb = self.image.copy()
+            thumb.thumbnail(max_size, Image.Resampling.LANCZOS)
+            self._thumbnail = thumb
+        return self._thumbnail
+
+    @property
+    def model_array(self):
+        """Array uint8 (H, W, 3) siap-model, dibuat sekali dari hasil decode yang sama."""
+        if self._model_array is None:
+            self._model_array = prepare_image(self.image)
+        return self._model_array
+
+    def info(self):
+        """Info gambar seperti `utils.get_image_info`, dengan dimensi asli dari header."""
+        width, height = self.header_size
+        return {
+            'format': self.format,
+            'mode': self.image.mode,
+            'size': (width, height),
+            'width': width,
+            'height': height,
+            'bytes': self.nbytes,
+        }
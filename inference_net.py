@@ -0,0 +1,160 @@
+# =============================================================================
+# FILE: inference_net.py
+# DESKRIPSI: Pembungkus model PyTorch untuk inferensi. Input berupa batch
+#            uint8 (N, H, W, 3) langsung dari gambar; konversi ke float,
+#            normalisasi, dan softmax dilakukan di dalam graf sehingga bisa
+#            diekspor utuh ke ONNX / TorchScript.
+# =============================================================================
+
+import inspect
+
+import numpy as np
+import torch
+from torch import nn
+
+# Statistik normalisasi default (ImageNet), dipakai jika model tidak menyimpan Normalize
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# `load_state_dict(assign=True)` dan `torch.device` sebagai context manager baru ada di PyTorch 2.1
+SUPPORTS_ASSIGN = "assign" in inspect.signature(nn.Module.load_state_dict).parameters
+
+
+class InferenceNet(nn.Module):
+    """Model + pra-pemrosesan: uint8 NHWC -> probabilitas (N, jumlah_kelas)."""
+
+    def __init__(self, model, mean=IMAGENET_MEAN, std=IMAGENET_STD):
+        super().__init__()
+        self.model = model
+        # Input berupa uint8 (0-255), jadi statistik ikut diskalakan
+        self.register_buffer("mean", torch.tensor(mean, dtype=torch.float32).view(1, 3, 1, 1) * 255.0)
+        self.register_buffer("std", torch.tensor(std, dtype=torch.float32).view(1, 3, 1, 1) * 255.0)
+
+    def forward(self, x):
+        # Satu alokasi float; normalisasi in-place di atasnya (tata letak memori
+        # NHWC dari permute dipertahankan, cocok untuk konvolusi channels_last)
+        x = x.permute(0, 3, 1, 2).float()
+        x.sub_(self.mean).div_(self.std)
+        return torch.softmax(self.model(x), dim=1)
+
+
+def learner_normalize_stats(learner):
+    """Mengambil mean/std dari transform `Normalize` milik DataLoaders fastai."""
+    after_batch = getattr(getattr(learner, 'dls', None), 'after_batch', None)
+    for tfm in getattr(after_batch, 'fs', []):
+        if type(tfm).__name__ == 'Normalize':
+            return tfm.mean.view(-1).tolist(), tfm.std.view(-1).tolist()
+    return list(IMAGENET_MEAN), list(IMAGENET_STD)
+
+
+def from_learner(learner):
+    """Membuat `InferenceNet` (mode eval, CPU) dari sebuah `Learner` fastai."""
+    mean, std = learner_normalize_stats(learner)
+    return InferenceNet(learner.model, mean, std).eval()
+
+
+def run(net, batch: np.ndarray) -> np.ndarray:
+    """Forward tanpa gradien untuk batch uint8 NumPy; hasil float32 NumPy."""
+    device = next(net.parameters(), torch.empty(0)).device
+    with torch.no_grad():
+        probs = net(torch.from_numpy(batch).to(device))
+    return probs.cpu().numpy().astype(np.float32, copy=False)
+
+
+# --- Format bobot saja (memory-mapped) ---------------------------------------
+# Satu file blob berisi semua tensor (rata 64 byte) + manifest JSON
+# `<blob>.json` berisi vocab, arsitektur, dan tabel tensor (nama, dtype,
+# shape, offset). File dibuka dengan np.memmap read-only sehingga banyak
+# proses di satu host berbagi satu salinan fisik bobot lewat page cache.
+
+ALIGNMENT = 64
+
+
+class AdaptiveConcatPool2d(nn.Module):
+    """Sama dengan `fastai.layers.AdaptiveConcatPool2d`: gabungan max + avg pooling."""
+
+    def __init__(self, size=1):
+        super().__init__()
+        self.ap = nn.AdaptiveAvgPool2d(size)
+        self.mp = nn.AdaptiveMaxPool2d(size)
+
+    def forward(self, x):
+        return torch.cat([self.mp(x), self.ap(x)], 1)
+
+
+class Flatten(nn.Module):
+    def forward(self, x):
+        return x.view(x.size(0), -1)
+
+
+def build_learner_model(arch, n_out):
+    """
+    Membangun ulang struktur model `vision_learner` fastai tanpa fastai:
+    body torchvision (tanpa avgpool/fc) + head default `create_head`.
+    Nama parameter identik dengan state_dict Learner aslinya.
+    """
+    import torchvision
+
+    backbone = getattr(torchvision.models, arch)()
+    nf = backbone.fc.in_features * 2  # concat pooling menggandakan fitur
+    body = nn.Sequential(*list(backbone.children())[:-2])
+    head = nn.Sequential(
+        AdaptiveConcatPool2d(), Flatten(),
+        nn.BatchNorm1d(nf), nn.Dropout(0.25), nn.Linear(nf, 512, bias=False), nn.ReLU(inplace=True),
+        nn.BatchNorm1d(512), nn.Dropout(0.5), nn.Linear(512, n_out, bias=False),
+    )
+    return nn.Sequential(body, head)
+
+
+def save_weights(net, path):
+    """
+    Menulis state_dict `InferenceNet` ke satu file blob. Mengembalikan tabel
+    tensor untuk dimasukkan ke manifest.
+    """
+    tensors = []
+    offset = 0
+    with open(path, "wb") as f:
+        for name, tensor in net.state_dict().items():
+            array = tensor.detach().cpu().contiguous().numpy()
+            padding = -offset % ALIGNMENT
+            f.write(b"\0" * padding)
+            offset += padding
+            f.write(array.tobytes())
+            tensors.append({
+                "name": name,
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+            })
+            offset += array.nbytes
+    return tensors
+
+
+def load_weights(path, manifest):
+    """
+    Memuat `InferenceNet` dari file bobot secara memory-mapped (read-only).
+    Parameter model langsung menunjuk ke halaman file, tanpa salinan privat.
+    Di PyTorch < 2.1 bobot disalin ke parameter biasa (benar, tetapi tanpa
+    berbagi halaman antar proses).
+    """
+    import warnings
+
+    blob = np.memmap(path, dtype=np.uint8, mode="r")
+    state_dict = {}
+    with warnings.catch_warnings():
+        # Tensor dari buffer read-only memicu peringatan; bobot tidak pernah ditulis saat eval
+        warnings.simplefilter("ignore", UserWarning)
+        for entry in manifest["tensors"]:
+            dtype = np.dtype(entry["dtype"])
+            count = int(np.prod(entry["shape"], dtype=np.int64))
+            view = np.frombuffer(blob, dtype=dtype, count=count, offset=entry["offset"])
+            state_dict[entry["name"]] = torch.from_numpy(view.reshape(entry["shape"]))
+
+    if not SUPPORTS_ASSIGN:
+        net = InferenceNet(build_learner_model(manifest["arch"], len(manifest["vocab"])))
+        net.load_state_dict(state_dict, strict=True)
+        return net.eval()
+    with torch.device("meta"):
+        net = InferenceNet(build_learner_model(manifest["arch"], len(manifest["vocab"])))
+    net.load_state_dict(state_dict, strict=True, assign=True)
+    return net.eval()
@@ -0,0 +1,307 @@
+# =============================================================================
+# FILE: inference_server.py
+# DESKRIPSI: Server HTTP asyncio mandiri untuk inferensi. Request yang datang
+#            bersamaan dikumpulkan menjadi micro-batch sebelum forward pass.
+#
+# Endpoint:
+#   POST /predict  -> body berisi byte gambar (PNG/JPEG), hasil dalam JSON
+#   GET  /healthz  -> proses hidup
+#   GET  /readyz   -> 200 hanya setelah model dimuat dan warmup selesai
+#   GET  /metrics  -> latensi per tahap dan counter (format teks Prometheus)
+#
+# Contoh:
+#   python inference_server.py --port 8502 --max-batch-size 32 --batch-window-ms 10
+#   python inference_server.py --workers 4 --threads-per-worker 2
+# =============================================================================
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import metrics
+from image_decode import decode_for_model
+from model_handler import ModelHandler
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class MicroBatcher:
+    """
+    Mengumpulkan gambar dari request yang berjalan bersamaan. Batch dikirim
+    saat mencapai `max_batch_size` atau saat jendela `window_ms` sejak item
+    pertama habis, mana yang lebih dulu.
+    """
+
+    def __init__(self, predict_batch, max_batch_size, window_ms, concurrency=1):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000.0
+        self._queue = asyncio.Queue()
+        # Default satu thread forward: torch sudah memakai banyak core per batch.
+        # Dengan pool worker multi-proses, tiap worker bisa menerima satu batch.
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="forward")
+        self._slots = asyncio.Semaphore(concurrency)
+        self._inflight = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, array):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((array, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(items) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.create_task(self._dispatch(items))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, items):
+        loop = asyncio.get_running_loop()
+        arrays = [array for array, _ in items]
+        try:
+            pred_idx, probs = await loop.run_in_executor(
+                self._executor, self.predict_batch, arrays, len(arrays)
+            )
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        self.batches += 1
+        self.items += len(items)
+        for i, (_, future) in enumerate(items):
+            if not future.done():
+                future.set_result((int(pred_idx[i]), probs[i]))
+
+
+class InferenceServer:
+    """Server HTTP/1.1 minimal (keep-alive) di atas `asyncio.start_server`."""
+
+    def __init__(self, model_path=config.MODEL_PATH, host=None, port=None,
+                 max_batch_size=None, batch_window_ms=None, pool=None):
+        """`pool` opsional: `InferenceWorkerPool` yang sudah di-fork sebelum event loop berjalan."""
+        self.model_path = model_path
+        self.pool = pool
+        self.host = host or config.SERVER_CONFIG["host"]
+        self.port = port or config.SERVER_CONFIG["port"]
+        self.max_batch_size = max_batch_size or config.SERVER_CONFIG["max_batch_size"]
+        self.batch_window_ms = (batch_window_ms if batch_window_ms is not None
+                                else config.SERVER_CONFIG["batch_window_ms"])
+        self.handler = None
+        self.batcher = None
+        self.ready = False
+        self.started_at = time.time()
+        self._tasks = []
+
+    def _load_and_warmup(self):
+        if self.pool is not None:
+            self.pool.warmup()
+            return self.pool.handler
+        # MicroBatcher menjalankan satu batch sekaligus, jadi satu slot dengan semua core
+        handler = ModelHandler(self.model_path, use_cache=False,
+                               fast_model_path=config.CASCADE_CONFIG["fast_model_path"] or None, slots=1)
+        handler.warmup(self.max_batch_size)
+        return handler
+
+    async def _startup(self):
+        loop = asyncio.get_running_loop()
+        try:
+            self.handler = await loop.run_in_executor(None, self._load_and_warmup)
+        except Exception as e:
+            print(f"❌ Gagal memuat model: {str(e)}")
+            return
+        if not self.handler.is_model_loaded():
+            print("❌ Model tidak tersedia; server tetap tidak siap (readyz = 503).")
+            return
+        if self.pool is not None:
+            self.batcher = MicroBatcher(self.pool.predict_batch, self.max_batch_size,
+                                        self.batch_window_ms, concurrency=self.pool.workers)
+        else:
+            self.batcher = MicroBatcher(self.handler.predict_batch, self.max_batch_size, self.batch_window_ms)
+        self._tasks.append(asyncio.create_task(self.batcher.run()))
+        self.ready = True
+        print(f"✅ Model siap (warmup selesai, {self.pool.workers if self.pool else 1} worker).")
+
+    async def _handle_predict(self, body):
+        if not self.ready:
+            return 503, {"error": "model not ready"}
+        if not body:
+            return 400, {"error": "empty body"}
+        if len(body) > config.MAX_FILE_SIZE:
+            return 413, {"error": config.ERROR_MESSAGES["file_too_large"]}
+
+        loop = asyncio.get_running_loop()
+        try:
+            array = await loop.run_in_executor(None, decode_for_model, body)
+        except Exception as e:
+            return 400, {"error": f"{config.ERROR_MESSAGES['invalid_image']} ({e})"}
+
+        idx, probs = await self.batcher.submit(array)
+        names = [name.capitalize() for name in self.handler.waste_types]
+        return 200, {
+            "prediction": names[idx],
+            "confidence": float(probs[idx]),
+            "probabilities": {name: float(p) for name, p in zip(names, probs)},
+        }
+
+    async def _route(self, method, path, body):
+        if path == "/healthz":
+            return 200, {"status": "ok", "uptime": time.time() - self.started_at}
+        if path == "/readyz":
+            ready = self.ready and (self.pool is None or self.pool.broken is None)
+            return (200 if ready else 503), {"ready": ready}
+        if path == "/metrics":
+            return 200, metrics.REGISTRY.render_prometheus()
+        if path == "/predict":
+            if method != "POST":
+                return 405, {"error": "use POST"}
+            return await self._handle_predict(body)
+        return 404, {"error": "not found"}
+
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await _write_response(writer, 400, {"error": "bad request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                if "transfer-encoding" in headers:
+                    # Body chunked tidak didukung; tanpa menutup koneksi, byte chunk akan
+                    # terbaca sebagai request berikutnya
+                    await _write_response(writer, 411, {"error": "chunked bodies are not supported; "
+                                                                 "send Content-Length"}, keep_alive=False)
+                    break
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Batas body tidak diketahui, jadi sisa stream tidak bisa dipakai untuk request berikutnya
+                    await _write_response(writer, 400, {"error": "invalid content-length"}, keep_alive=False)
+                    break
+                if length > config.MAX_FILE_SIZE:
+                    await _write_response(writer, 413, {"error": config.ERROR_MESSAGES["file_too_large"]},
+                                          keep_alive=False)
+                    break
+                if length and headers.get("expect", "").lower() == "100-continue":
+                    # Klien (mis. curl untuk unggahan besar) menunggu ini sebelum mengirim body
+                    writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+                    await writer.drain()
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = await self._route(method.upper(), target.split("?", 1)[0], body)
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await _write_response(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._serve_client, self.host, self.port)
+        print(f"🚀 Inference server berjalan di http://{self.host}:{self.port}")
+        self._tasks.append(asyncio.create_task(self._startup()))
+        async with server:
+            await server.serve_forever()
+
+
+async def _write_response(writer, status, payload, keep_alive=True):
+    # Payload string dikirim apa adanya sebagai teks (format eksposisi Prometheus)
+    if isinstance(payload, str):
+        body, content_type = payload.encode(), "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body, content_type = json.dumps(payload).encode(), "application/json"
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Server HTTP inferensi dengan micro-batching.")
+    parser.add_argument("--model", default=config.MODEL_PATH, help="Path file model")
+    parser.add_argument("--host", default=config.SERVER_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=config.SERVER_CONFIG["port"])
+    parser.add_argument("--max-batch-size", type=int, default=config.SERVER_CONFIG["max_batch_size"])
+    parser.add_argument("--batch-window-ms", type=float, default=config.SERVER_CONFIG["batch_window_ms"])
+    parser.add_argument("--workers", type=int, default=config.WORKER_CONFIG["workers"],
+                        help="Jumlah proses worker inferensi (pre-fork); 1 = tanpa fork")
+    parser.add_argument("--threads-per-worker", type=int, default=config.WORKER_CONFIG["threads_per_worker"])
+    args = parser.parse_args(argv)
+
+    pool = None
+    if args.workers > 1:
+        # Fork harus terjadi sebelum event loop dan thread lain dibuat
+        from worker_pool import InferenceWorkerPool
+        if config.CASCADE_CONFIG["fast_model_path"]:
+            # Worker menjalankan forward model penuh langsung; kaskade tidak ikut ter-fork
+            print("⚠️ FAST_MODEL_PATH diabaikan: mode kaskade tidak didukung dengan --workers > 1.")
+        handler = ModelHandler(args.model, use_cache=False)
+        pool = InferenceWorkerPool(handler, args.workers, args.threads_per_worker)
+
+    metrics.start_file_dumper()
+    server = InferenceServer(args.model, args.host, args.port, args.max_batch_size,
+                             args.batch_window_ms, pool=pool)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# =============================================================================
+# FILE: metrics.py
+# DESKRIPSI: Instrumentasi latensi per tahap dengan overhead rendah
+#            (counter + histogram bucket tetap). Bisa dirender dalam format
+#            teks Prometheus, di-dump ke file saat berjalan headless, atau
+#            ditampilkan sebagai panel debug di sidebar Streamlit.
+#
+# Tahap jalur klasifikasi: decode, validation, transform, forward,
+# postprocess (argmax + pembentukan dict probabilitas; softmax sendiri
+# menyatu di graf model sehingga terhitung di "forward"), render.
+# =============================================================================
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+# Batas atas bucket histogram (detik)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Histogram kumulatif ala Prometheus dengan bucket tetap."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # bucket terakhir = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Perkiraan kuantil dari bucket (interpolasi linear di dalam bucket)."""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        lower = 0.0
+        for upper, count in zip(self.buckets + (float("inf"),), self.counts):
+            if cumulative + count >= target and count:
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (target - cumulative) / count
+            cumulative += count
+            lower = upper
+        return lower
+
+
+class MetricsRegistry:
+    """Kumpulan counter dan histogram latensi per tahap, aman untuk banyak thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def summary(self):
+        """Ringkasan per tahap (jumlah, rata-rata, p50/p95 perkiraan) dalam milidetik."""
+        with self._lock:
+            return {
+                stage: {
+                    "count": h.count,
+                    "mean_ms": 1000.0 * h.sum / h.count if h.count else 0.0,
+                    "p50_ms": 1000.0 * h.quantile(0.50),
+                    "p95_ms": 1000.0 * h.quantile(0.95),
+                }
+                for stage, h in sorted(self.histograms.items())
+            }
+
+    def render_prometheus(self, prefix="waste_classifier"):
+        """Format eksposisi teks Prometheus."""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+            metric = f"{prefix}_stage_seconds"
+            if self.histograms:
+                lines.append(f"# HELP {metric} Latency of each classification stage.")
+                lines.append(f"# TYPE {metric} histogram")
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for upper, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{upper}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {h.sum}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def dump_to_file(self, path):
+        """Menulis teks Prometheus ke file secara atomik (untuk node_exporter textfile / headless)."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def timed(stage):
+    """Context manager pengukur durasi sebuah tahap pada registry global."""
+    return REGISTRY.timer(stage)
+
+
+def inc(name, value=1):
+    REGISTRY.inc(name, value)
+
+
+def start_file_dumper(path=None, interval=None):
+    """
+    Thread latar belakang yang menulis metrik ke file secara berkala.
+    Tidak melakukan apa-apa jika path kosong (METRICS_FILE tidak diisi).
+    """
+    path = path or config.METRICS_CONFIG["file"]
+    interval = interval or config.METRICS_CONFIG["dump_interval"]
+    if not path:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            REGISTRY.dump_to_file(path)
+
+    thread = threading.Thread(target=loop, name="metrics-dumper", daemon=True)
+    thread.start()
+    return thread
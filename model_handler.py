@@ -4,28 +4,167 @@
 #            Versi ini sudah berisi patch untuk kompatibilitas Windows.
 # =============================================================================
 
+import importlib.util
+import json
+import math
 import os
 import platform
 import pathlib
 import random
+import threading
+import time
 import warnings
+from contextlib import contextmanager
+import numpy as np
 from PIL import Image
 
+import config
+import metrics
+from phash_index import PHashIndex, dhash
+from preprocessing import BatchBuffer, prepare_image
+from prediction_cache import PredictionCache, image_key, model_fingerprint
+
 # Mengabaikan beberapa peringatan dari library internal
 warnings.filterwarnings("ignore", category=UserWarning, module="torch.utils.data")
 warnings.filterwarnings("ignore", category=FutureWarning)
 
-# --- Cek dan Import Library FastAI ---
-try:
-    from fastai.vision.all import load_learner, PILImage
-    FASTAI_AVAILABLE = True
-except ImportError:
-    FASTAI_AVAILABLE = False
+# --- Cek Ketersediaan Library FastAI ---
+# Import fastai/torch ditunda sampai model benar-benar dimuat, sehingga backend
+# ONNX Runtime bisa berjalan tanpa memuat fastai sama sekali.
+FASTAI_AVAILABLE = importlib.util.find_spec("fastai") is not None
+if not FASTAI_AVAILABLE:
     print("="*50)
     print("PERINGATAN: Library FastAI tidak ditemukan.")
     print("Silakan install dengan perintah: pip install fastai")
     print("="*50)
 
+# Backend inferensi yang didukung beserta library yang dibutuhkan
+BACKEND_MODULES = {
+    "fastai": "fastai",
+    "torchscript": "torch",
+    "weights": "torch",
+    "onnx": "onnxruntime",
+    "module": "torch",  # modul PyTorch di memori (ModelHandler.from_net), tidak dimuat dari file
+}
+
+
+def detect_backend(model_path):
+    """Menebak backend dari ekstensi file model."""
+    ext = os.path.splitext(model_path)[1].lower()
+    if ext == ".onnx":
+        return "onnx"
+    if ext in (".pt", ".ts"):
+        return "torchscript"
+    if ext == ".weights":
+        return "weights"
+    return "fastai"
+
+
+def load_manifest(model_path):
+    """Membaca manifest JSON (vocab, ukuran input) di samping artefak hasil ekspor."""
+    manifest_path = f"{model_path}.json"
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _center_crop(array, size):
+    target_w, target_h = size
+    h, w = array.shape[:2]
+    top, left = (h - target_h) // 2, (w - target_w) // 2
+    return array[top:top + target_h, left:left + target_w]
+
+
+def tta_batch(image: Image.Image, size=config.INPUT_SIZE,
+              augmentation=config.TRAINING_CONFIG["augmentation"]):
+    """
+    Varian test-time augmentation dari satu gambar sebagai satu batch uint8
+    (N, H, W, 3): asli, flip horizontal, rotasi +/- setengah `max_rotate`,
+    dan zoom tengah `max_zoom`. Rotasi dan zoom diambil dari resize sumber
+    yang lebih besar lalu di-crop tengah, jadi tidak ada sudut kosong dan
+    detailnya tidak berasal dari upscaling hasil 224x224.
+    """
+    base = prepare_image(image, size)
+    variants = [base]
+    if augmentation.get("horizontal_flip"):
+        variants.append(base[:, ::-1])
+
+    angle = augmentation.get("max_rotate", 0) / 2
+    if angle:
+        theta = math.radians(angle)
+        cover = abs(math.cos(theta)) + abs(math.sin(theta))
+        large = tuple(int(round(side * cover)) for side in size)
+        source = Image.fromarray(prepare_image(image, large))
+        for a in (angle, -angle):
+            rotated = np.asarray(source.rotate(a, resample=Image.BILINEAR))
+            variants.append(_center_crop(rotated, size))
+
+    zoom = augmentation.get("max_zoom", 1.0)
+    if zoom > 1.0:
+        large = tuple(int(round(side * zoom)) for side in size)
+        variants.append(_center_crop(prepare_image(image, large), size))
+    return np.stack(variants)
+
+# --- Pembatas Konkurensi Forward ---
+class InferenceSlots:
+    """
+    Slot forward bersamaan berukuran tetap untuk banyak sesi/thread.
+
+    Ini bukan replika model: semua slot memakai satu model yang sama.
+    Jalur forward bersifat murni (model eval, tanpa gradien, tanpa state
+    DataLoader), jadi forward boleh berjalan bersamaan tanpa lock global;
+    kelas ini hanya membatasi jumlahnya dan mencatat metrik antrean.
+    Agar forward yang bersamaan tidak berebut core, `ModelHandler` membagi
+    thread intra-op per forward menjadi cpu_count // jumlah slot (lihat
+    `ModelHandler.apply_profile`).
+    """
+
+    def __init__(self, size):
+        self.size = max(1, int(size))
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @contextmanager
+    def acquire(self):
+        start = time.perf_counter()
+        with self._cond:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            while self.in_flight >= self.size:
+                self._cond.wait()
+            self.waiting -= 1
+            self.in_flight += 1
+            waited = time.perf_counter() - start
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self.completed += 1
+                self._cond.notify()
+
+    def stats(self):
+        """Metrik antrean: slot terpakai, yang menunggu, dan waktu tunggu."""
+        with self._cond:
+            return {
+                "size": self.size,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "completed": self.completed,
+                "avg_wait_ms": 1000.0 * self.total_wait / self.completed if self.completed else 0.0,
+                "max_wait_ms": 1000.0 * self.max_wait,
+            }
+
+
 # --- Kelas Utama untuk Mengelola Model ---
 class ModelHandler:
     """
@@ -33,66 +172,403 @@ class ModelHandler:
     memuat model, melakukan pra-pemrosesan gambar, dan prediksi.
     """
     
-    def __init__(self, model_path="my_model.pkl"):
-        """Inisialisasi handler, mengatur path model dan memuatnya."""
+    def __init__(self, model_path="my_model.pkl", use_cache=True, backend=None, fast_model_path=None,
+                 slots=None):
+        """
+        Inisialisasi handler, mengatur path model dan memuatnya.
+        `backend` bisa "fastai", "torchscript", "weights", atau "onnx" ("module"
+        hanya untuk `from_net`); jika kosong diambil dari `config.MODEL_BACKEND`
+        atau ditebak dari ekstensi file.
+        Jika `fast_model_path` diisi, mode kaskade diaktifkan (lihat `enable_cascade`).
+        `slots` = jumlah forward bersamaan (default `CONCURRENCY_CONFIG["slots"]`)
+        atau `InferenceSlots` yang dibagi dengan handler lain;
+        pemanggil yang hanya menjalankan satu forward sekaligus memakai 1 agar
+        satu forward mendapat semua core.
+        """
         self.model_path = model_path
+        self.backend = backend or config.MODEL_BACKEND or detect_backend(model_path or "")
         self.model = None
         self.waste_types = [] # Akan diisi dari vocabulary model
+        self.batch_size = config.BATCH_SIZE
+        self._run = None  # fungsi forward: batch uint8 NHWC -> probabilitas
+        self._net = None  # modul PyTorch di balik `_run` (backend fastai/torchscript)
+        self.fp32_net = None
+        self.quantized = None
+        self.slots = slots if isinstance(slots, InferenceSlots) else InferenceSlots(
+            slots or config.CONCURRENCY_CONFIG["slots"])
+        self.buffers = BatchBuffer(config.INPUT_SIZE)  # batch uint8 yang dipakai ulang per thread
+        self.profile = None  # profil autotune yang diterapkan (lihat apply_profile)
+        self.fingerprint = None
+        self.fast = None  # handler model cepat untuk mode kaskade
+        self.cascade_threshold = None
+        self._fast_order = None
+        self._tier_stats = {}
+        self._tier_lock = threading.Lock()
+        self.cache = None
+        self.near_duplicates = None
+        if use_cache:
+            self.cache = PredictionCache(
+                db_path=config.CACHE_CONFIG["prediction_cache_path"] or None
+            )
+            if config.PHASH_CONFIG["enabled"]:
+                self.near_duplicates = PHashIndex()
         
-        if FASTAI_AVAILABLE:
+        if self.backend not in BACKEND_MODULES:
+            raise ValueError(f"Backend tidak dikenal: {self.backend}")
+        if model_path is None:
+            # Tanpa file model: jalur forward dipasang belakangan (lihat from_net)
+            return
+
+        if importlib.util.find_spec(BACKEND_MODULES[self.backend]) is not None:
             self.load_model()
+            if fast_model_path:
+                self.enable_cascade(fast_model_path)
         else:
-            # Set default classes jika fastai tidak ada
+            # Set default classes jika library backend tidak ada
             self.waste_types = ['cardboard', 'glass', 'metal', 'paper', 'plastic']
-            print("FastAI tidak tersedia. Prediksi akan menggunakan data dummy.")
+            print(f"Backend '{self.backend}' tidak tersedia. Prediksi akan menggunakan data dummy.")
     
+    @classmethod
+    def from_net(cls, net, waste_types, fingerprint="in-memory", use_cache=False):
+        """
+        Membuat handler dari modul PyTorch yang sudah ada (input uint8 NHWC,
+        output probabilitas), tanpa file model. Dipakai oleh benchmark.
+        """
+        handler = cls(None, use_cache=use_cache, backend="module")
+        handler.waste_types = list(waste_types)
+        handler._set_torch_net(net.eval())
+        handler.fingerprint = fingerprint
+        return handler
+
     def load_model(self):
         """
-        Memuat model FastAI. Secara otomatis menangani masalah path antara Windows dan Linux/macOS.
+        Memuat model sesuai backend. Untuk FastAI, secara otomatis menangani
+        masalah path antara Windows dan Linux/macOS.
         """
         try:
             if not os.path.exists(self.model_path):
                 raise FileNotFoundError(f"File model tidak ditemukan di: {self.model_path}")
 
-            # SOLUSI: Terapkan 'patch' jika berjalan di Windows untuk memuat model dari Linux/macOS
-            if platform.system() == "Windows":
-                temp = pathlib.PosixPath
-                try:
-                    pathlib.PosixPath = pathlib.WindowsPath
-                    self.model = load_learner(self.model_path)
-                finally:
-                    # Selalu kembalikan ke kondisi semula setelah selesai
-                    pathlib.PosixPath = temp
+            if self.backend == "module":
+                raise ValueError("Backend 'module' tidak dimuat dari file; gunakan ModelHandler.from_net.")
+            self.apply_profile()
+            if self.backend == "onnx":
+                self._load_onnx()
+            elif self.backend == "torchscript":
+                self._load_torchscript()
+            elif self.backend == "weights":
+                self._load_weights()
             else:
-                # Untuk Linux, macOS, atau sistem lain, muat secara normal
-                self.model = load_learner(self.model_path)
-            
-            # Perbarui tipe kelas sampah (waste_types) dari vocabulary model
-            if hasattr(self.model, 'dls') and hasattr(self.model.dls, 'vocab'):
-                self.waste_types = list(self.model.dls.vocab)
-            else:
-                # Fallback jika vocab tidak ditemukan
-                self.waste_types = ['Cardboard', 'Glass', 'Metal', 'Paper', 'Plastic']
+                self._load_fastai()
+            self.fingerprint = model_fingerprint(self.model_path)
                 
         except Exception as e:
             print(f"❌ Gagal memuat model: {str(e)}")
             self.model = None
+            self._run = None
             # Re-raise the exception to be caught by Streamlit
             raise e
-    
-    def predict(self, image: Image.Image):
+
+    def apply_profile(self):
+        """
+        Menerapkan profil hasil `autotune.py` (jika ada untuk host ini):
+        jumlah thread intra/inter-op dan ukuran batch inferensi. Profil
+        diukur dengan forward torch, jadi tidak dipakai untuk ONNX Runtime
+        yang punya thread pool dan karakteristik batch sendiri.
+
+        Thread intra-op dibagi ke slot forward, dengan atau tanpa profil:
+        `slots.size` forward bersamaan yang masing-masing memakai semua core
+        (atau seluruh jumlah thread hasil tuning untuk satu forward) akan
+        saling berebut.
+        """
+        import autotune
+
+        self.profile = None if self.backend == "onnx" else autotune.load_profile()
+        if self.profile is None:
+            if self.backend != "onnx":
+                import torch
+                torch.set_num_threads(self.threads_per_slot())
+            return None
+        best = self.profile["best"]
+        self.batch_size = best["batch_size"]
+        import torch
+        # Autotune mengukur satu forward sekaligus; jumlah thread-nya dibagi ke slot bersamaan
+        torch.set_num_threads(max(1, best["num_threads"] // self.slots.size))
+        try:
+            torch.set_num_interop_threads(best["interop_threads"])
+        except RuntimeError:
+            pass  # hanya bisa diatur sekali, sebelum ada kerja paralel
+        return best
+
+    def threads_per_slot(self):
+        """Thread intra-op per forward agar semua slot bersamaan pas di jumlah core."""
+        return max(1, (os.cpu_count() or 1) // self.slots.size)
+
+    def _load_fastai(self):
+        """Memuat Learner FastAI (`.pkl`) beserta jalur forward langsungnya."""
+        from fastai.vision.all import load_learner
+        import inference_net
+
+        # SOLUSI: Terapkan 'patch' jika berjalan di Windows untuk memuat model dari Linux/macOS
+        if platform.system() == "Windows":
+            temp = pathlib.PosixPath
+            try:
+                pathlib.PosixPath = pathlib.WindowsPath
+                self.model = load_learner(self.model_path)
+            finally:
+                # Selalu kembalikan ke kondisi semula setelah selesai
+                pathlib.PosixPath = temp
+        else:
+            # Untuk Linux, macOS, atau sistem lain, muat secara normal
+            self.model = load_learner(self.model_path)
+        
+        # Perbarui tipe kelas sampah (waste_types) dari vocabulary model
+        if hasattr(self.model, 'dls') and hasattr(self.model.dls, 'vocab'):
+            self.waste_types = list(self.model.dls.vocab)
+        else:
+            # Fallback jika vocab tidak ditemukan
+            self.waste_types = ['Cardboard', 'Glass', 'Metal', 'Paper', 'Plastic']
+
+        # Jalur forward langsung (tanpa DataLoader fastai) untuk predict_batch
+        self._set_torch_net(inference_net.from_learner(self.model))
+
+    def _load_torchscript(self):
+        """Memuat artefak TorchScript hasil `export_model.py`."""
+        import torch
+
+        net = torch.jit.load(self.model_path, map_location="cpu").eval()
+        self.waste_types = load_manifest(self.model_path).get("vocab") or list(config.WASTE_CATEGORIES)
+        self._set_torch_net(net)
+
+    def _load_weights(self):
+        """
+        Memuat file bobot saja (`export_model.py --format weights`) secara
+        memory-mapped: cepat dan berbagi halaman fisik antar proses.
+        """
+        import inference_net
+
+        manifest = load_manifest(self.model_path)
+        if "tensors" not in manifest:
+            raise FileNotFoundError(f"Manifest bobot tidak ditemukan: {self.model_path}.json")
+        self.waste_types = manifest["vocab"]
+        self._set_torch_net(inference_net.load_weights(self.model_path, manifest))
+
+    def _set_torch_net(self, net):
+        """Memasang modul PyTorch (`InferenceNet` atau TorchScript) sebagai jalur forward."""
+        import inference_net
+
+        self._net = net
+        self._run = lambda batch: inference_net.run(net, batch)
+
+    def quantize(self, calibration_images=None, mode=None):
+        """
+        Mengganti jalur forward dengan model int8 (post-training quantization).
+
+        mode "static": bobot dan aktivasi int8 (konvolusi ikut terkuantisasi),
+        butuh `calibration_images` (PIL / array uint8) untuk kalibrasi.
+        mode "dynamic": hanya layer Linear di head, tanpa kalibrasi.
+        Model fp32 tetap disimpan di `self.fp32_net` untuk laporan akurasi.
+        """
+        import quantization
+
+        if self.backend != "fastai" or self._net is None:
+            raise RuntimeError("Kuantisasi hanya didukung untuk backend fastai yang sudah dimuat.")
+        mode = mode or config.QUANTIZATION_CONFIG["mode"]
+        if self.fp32_net is None:
+            self.fp32_net = self._net
+
+        if mode == "static":
+            if not calibration_images:
+                raise ValueError("Kuantisasi statis membutuhkan gambar kalibrasi.")
+            batch = np.stack([
+                img if isinstance(img, np.ndarray) else prepare_image(img)
+                for img in calibration_images
+            ])
+            qnet = quantization.quantize_static(self.fp32_net, batch, self.batch_size)
+        elif mode == "dynamic":
+            qnet = quantization.quantize_dynamic(self.fp32_net)
+        else:
+            raise ValueError(f"Mode kuantisasi tidak dikenal: {mode}")
+
+        self._set_torch_net(qnet)
+        self.quantized = mode
+        # Hasil int8 bisa sedikit berbeda, jadi jangan bercampur dengan cache fp32
+        self.fingerprint = f"{model_fingerprint(self.model_path)}:int8-{mode}"
+
+    def _load_onnx(self):
+        """Memuat artefak ONNX dan menjalankannya lewat ONNX Runtime (CPU), tanpa fastai/torch."""
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads_per_slot()
+        session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        input_name = session.get_inputs()[0].name
+        self.waste_types = load_manifest(self.model_path).get("vocab") or list(config.WASTE_CATEGORIES)
+        self._run = lambda batch: session.run(None, {input_name: batch})[0].astype(np.float32, copy=False)
+
+    def enable_cascade(self, fast_model_path, threshold=None):
+        """
+        Mode kaskade: semua gambar dijalankan dulu di model kecil (mis. ResNet18
+        atau MobileNet yang dilatih pada kelas yang sama); hanya gambar dengan
+        probabilitas teratas di bawah `threshold` (default
+        `CASCADE_CONFIG["threshold"]`) yang dinaikkan ke model ini.
+        """
+        # Kedua model berbagi satu InferenceSlots: forward cepat dan penuh dihitung bersama,
+        # jadi paling banyak `slots.size` forward berjalan, masing-masing dengan threads_per_slot()
+        fast = ModelHandler(fast_model_path, use_cache=False, slots=self.slots)
+        if not fast.is_model_loaded():
+            raise RuntimeError(f"Model cepat tidak bisa dimuat: {fast_model_path}")
+        if sorted(fast.waste_types) != sorted(self.waste_types):
+            raise ValueError(f"Kelas model cepat {fast.waste_types} berbeda dengan {self.waste_types}")
+        self.fast = fast
+        self.cascade_threshold = threshold if threshold is not None else config.CASCADE_CONFIG["threshold"]
+        # Kolom probabilitas model cepat diurutkan ulang mengikuti `self.waste_types`
+        self._fast_order = [fast.waste_types.index(name) for name in self.waste_types]
+        self._tier_stats = {tier: {"images": 0, "seconds": 0.0} for tier in ("fast", "full")}
+        self.fingerprint = f"{self.fingerprint}+cascade:{fast.fingerprint[:16]}@{self.cascade_threshold}"
+
+    def _record_tier(self, tier, n_images, seconds):
+        metrics.REGISTRY.observe(f"cascade_{tier}", seconds)
+        metrics.inc(f"cascade_{tier}_images", n_images)
+        with self._tier_lock:
+            self._tier_stats[tier]["images"] += n_images
+            self._tier_stats[tier]["seconds"] += seconds
+
+    def cascade_stats(self):
+        """Hit rate tingkat pertama dan latensi per gambar tiap tingkat; None jika kaskade mati."""
+        if self.fast is None:
+            return None
+        with self._tier_lock:
+            fast, full = dict(self._tier_stats["fast"]), dict(self._tier_stats["full"])
+        total = fast["images"]
+        return {
+            "threshold": self.cascade_threshold,
+            "images": total,
+            "escalated": full["images"],
+            "fast_hit_rate": 1.0 - full["images"] / total if total else 0.0,
+            "fast_ms_per_image": 1000.0 * fast["seconds"] / fast["images"] if fast["images"] else 0.0,
+            "full_ms_per_image": 1000.0 * full["seconds"] / full["images"] if full["images"] else 0.0,
+        }
+
+    def _predict_cascade(self, images, batch_size=None):
+        arrays = [img if isinstance(img, np.ndarray) else prepare_image(img) for img in images]
+        start = time.perf_counter()
+        _, probs = self.fast.predict_batch(arrays, batch_size)
+        probs = probs[:, self._fast_order]
+        self._record_tier("fast", len(arrays), time.perf_counter() - start)
+
+        escalate = np.flatnonzero(probs.max(axis=1) < self.cascade_threshold)
+        if len(escalate):
+            start = time.perf_counter()
+            probs[escalate] = self._forward_batch([arrays[i] for i in escalate], batch_size)
+            self._record_tier("full", len(escalate), time.perf_counter() - start)
+        return probs.argmax(axis=1), probs
+
+    def predict_batch(self, images, batch_size=None):
+        """
+        Melakukan prediksi pada banyak gambar sekaligus.
+
+        Gambar ditumpuk menjadi satu tensor dan dijalankan dalam potongan
+        berukuran `batch_size` (default `config.BATCH_SIZE`), tanpa membuat
+        DataLoader baru seperti `Learner.predict`.
+
+        Mengembalikan tuple `(pred_idx, probs)`: array indeks kelas (N,) dan
+        matriks probabilitas (N, jumlah_kelas) dengan urutan `self.waste_types`.
+        """
+        images = list(images)
+        n_classes = len(self.waste_types) or len(config.WASTE_CATEGORIES)
+        if not images:
+            return np.empty(0, dtype=np.int64), np.empty((0, n_classes), dtype=np.float32)
+
+        if not self.is_model_loaded():
+            print("   > Peringatan: Model tidak siap, menggunakan prediksi dummy.")
+            return self._dummy_batch_prediction(len(images))
+
+        if self.fast is not None:
+            return self._predict_cascade(images, batch_size)
+        probs = self._forward_batch(images, batch_size)
+        return probs.argmax(axis=1), probs
+
+    def _forward_batch(self, images, batch_size=None):
+        """Forward model ini saja (tanpa kaskade); mengembalikan matriks probabilitas."""
+        n_classes = len(self.waste_types) or len(config.WASTE_CATEGORIES)
+        batch_size = batch_size or self.batch_size
+        probs = np.empty((len(images), n_classes), dtype=np.float32)
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            batch = self.buffers.fill(chunk)
+            with self.slots.acquire(), metrics.timed("forward"):
+                probs[start:start + len(chunk)] = self._run(batch)
+            metrics.inc("batches")
+        metrics.inc("images", len(images))
+        return probs
+
+    def warmup(self, batch_size=1):
+        """
+        Menjalankan forward dummy agar alokasi memori dan inisialisasi kernel
+        terjadi sebelum request pertama.
+        """
+        width, height = config.INPUT_SIZE
+        dummy = np.zeros((batch_size, height, width, 3), dtype=np.uint8)
+        if not self.is_model_loaded():
+            return
+        # Langsung ke forward agar warmup tidak ikut statistik kaskade
+        self._forward_batch(list(dummy), batch_size)
+        if self.fast is not None:
+            self.fast.warmup(batch_size)
+
+    def predict(self, image: Image.Image, tta=False, session=None):
         """
         Melakukan prediksi pada sebuah gambar (objek PIL.Image).
+
+        Dengan `tta=True`, varian dari `tta_batch` dijalankan dalam satu
+        forward pass dan probabilitasnya dirata-rata.
+
+        Indeks near-duplicate hanya dipakai jika `session` diberikan, dan
+        hanya di antara gambar sesi itu (mis. jepretan kamera berurutan);
+        gambar pengguna lain yang kebetulan mirip tidak ikut mewarisi hasil.
         """
         if not self.is_model_loaded():
             print("   > Peringatan: Model tidak siap, menggunakan prediksi dummy.")
             return self._dummy_prediction()
         
+        variant = f"{self.fingerprint}:tta" if tta else self.fingerprint
+        key = None
+        if self.cache is not None:
+            key = image_key(image, variant)
+            cached = self.cache.get(key)
+            if cached is not None:
+                metrics.inc("cache_hits")
+                prediction, probabilities = cached
+                return prediction, dict(probabilities)
+
+        # Frame yang hampir identik dengan gambar yang baru saja diklasifikasi
+        image_hash = None
+        if self.near_duplicates is not None and session is not None:
+            image_hash = dhash(image)
+            cached = self.near_duplicates.get(f"{variant}:{session}", image_hash)
+            if cached is not None:
+                metrics.inc("near_duplicate_hits")
+                prediction, probabilities = cached
+                return prediction, dict(probabilities)
+
         try:
-            pred, pred_idx, probs = self.model.predict(image)
-            prediction = str(pred).capitalize()
-            probabilities = {name.capitalize(): float(p) for name, p in zip(self.waste_types, probs)}
-            return prediction, probabilities
+            # Jalur forward murni (bukan `Learner.predict`, yang mengubah state
+            # DataLoader/callback dan tidak aman dipanggil dari banyak sesi)
+            if tta:
+                variants = tta_batch(image)
+                _, batch_probs = self.predict_batch(list(variants), batch_size=len(variants))
+            else:
+                _, batch_probs = self.predict_batch([image])
+            with metrics.timed("postprocess"):
+                probs = batch_probs.mean(axis=0)
+                prediction = str(self.waste_types[int(probs.argmax())]).capitalize()
+                probabilities = {name.capitalize(): float(p) for name, p in zip(self.waste_types, probs)}
+            if key is not None:
+                self.cache.put(key, [prediction, probabilities])
+            if image_hash is not None:
+                self.near_duplicates.put(f"{variant}:{session}", image_hash, [prediction, probabilities])
+            return prediction, dict(probabilities)
             
         except Exception as e:
             print(f"   > Terjadi error saat prediksi: {str(e)}")
@@ -100,7 +576,7 @@ class ModelHandler:
 
     def is_model_loaded(self):
         """Mengecek apakah model sudah berhasil dimuat."""
-        return self.model is not None and FASTAI_AVAILABLE
+        return self._run is not None
         
     def _dummy_prediction(self):
         """Menghasilkan prediksi acak jika model tidak tersedia."""
@@ -111,4 +587,57 @@ class ModelHandler:
         total = sum(probs)
         probs = [p / total for p in probs]
         probabilities = {name.capitalize(): p for name, p in zip(self.waste_types, probs)}
-        return prediction, probabilities
\ No newline at end of file
+        return prediction, probabilities
+
+    def _dummy_batch_prediction(self, n):
+        """Versi batch dari `_dummy_prediction`: indeks dan probabilitas acak."""
+        if not self.waste_types:
+             self.waste_types = ['Cardboard', 'Glass', 'Metal', 'Paper', 'Plastic']
+        probs = np.random.random((n, len(self.waste_types))).astype(np.float32)
+        probs /= probs.sum(axis=1, keepdims=True)
+        return probs.argmax(axis=1), probs
+
+
+# --- Pemuat Model di Latar Belakang ---
+class BackgroundModelLoader:
+    """
+    Memuat `ModelHandler` dan menjalankan warmup di thread latar belakang,
+    sehingga halaman pertama bisa tampil tanpa menunggu model siap.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.handler = None
+        self.error = None
+        self.started_at = time.time()
+        self.load_seconds = None
+        self._done = threading.Event()
+        self._thread = threading.Thread(
+            target=self._load, args=args, kwargs=kwargs, name="model-loader", daemon=True
+        )
+        self._thread.start()
+
+    def _load(self, *args, **kwargs):
+        try:
+            handler = ModelHandler(*args, **kwargs)
+            handler.warmup()
+            self.handler = handler
+        except Exception as e:
+            self.error = e
+        finally:
+            self.load_seconds = time.time() - self.started_at
+            self._done.set()
+
+    @property
+    def status(self):
+        """"loading", "ready", atau "error"."""
+        if not self._done.is_set():
+            return "loading"
+        return "error" if self.error is not None else "ready"
+
+    def get(self, timeout=None):
+        """Menunggu model siap lalu mengembalikan handler (atau melempar error pemuatan)."""
+        if not self._done.wait(timeout):
+            raise TimeoutError("Model belum selesai dimuat.")
+        if self.error is not None:
+            raise self.error
+        return self.handler
\ No newline at end of file
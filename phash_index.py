@@ -0,0 +1,101 @@
+# =============================================================================
+# FILE: phash_index.py
+# DESKRIPSI: Indeks near-duplicate berbasis perceptual hash (dHash) di depan
+#            ModelHandler.predict. Frame kamera yang hampir identik (noise
+#            sensor, encode ulang JPEG) tidak pernah cocok di cache byte-exact,
+#            tetapi dHash-nya hanya berbeda beberapa bit, sehingga hasil
+#            klasifikasi sebelumnya bisa dipakai ulang.
+# =============================================================================
+
+import threading
+import time
+from collections import OrderedDict
+
+from PIL import Image
+
+import config
+
+
+def dhash(image: Image.Image, hash_size=8):
+    """
+    Difference hash 64-bit (untuk `hash_size=8`): gambar diperkecil ke
+    thumbnail grayscale (hash_size+1) x hash_size, lalu tiap bit menyatakan
+    apakah piksel lebih terang dari tetangga kanannya.
+    """
+    # Resize dulu baru konversi grayscale: jauh lebih murah untuk foto besar
+    small = image.resize((hash_size + 1, hash_size), Image.BILINEAR, reducing_gap=2.0).convert("L")
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class PHashIndex:
+    """
+    Indeks hasil terbaru dengan pencarian jarak Hamming, eviksi LRU dan TTL.
+    `namespace` (mis. sidik jari model) memisahkan hasil model atau mode yang
+    berbeda. Pencarian linear; ukurannya dibatasi `max_entries` sehingga
+    tetap murah dibanding satu forward pass.
+    """
+
+    def __init__(self, max_entries=None, max_distance=None, ttl=None):
+        self.max_entries = max_entries or config.PHASH_CONFIG["max_entries"]
+        self.max_distance = max_distance if max_distance is not None else config.PHASH_CONFIG["max_distance"]
+        self.ttl = ttl if ttl is not None else config.PHASH_CONFIG["ttl"]
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (namespace, hash) -> (waktu_simpan, nilai)
+        self._lock = threading.Lock()
+
+    def get(self, namespace, value_hash):
+        """Nilai dari entri terdekat dalam `max_distance` bit; None jika tidak ada."""
+        now = time.time()
+        with self._lock:
+            best_key, best_distance = None, self.max_distance + 1
+            for key, (created, _) in list(self._entries.items()):
+                if self.ttl > 0 and now - created > self.ttl:
+                    del self._entries[key]
+                    continue
+                if key[0] != namespace:
+                    continue
+                distance = hamming(key[1], value_hash)
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][1]
+
+    def put(self, namespace, value_hash, value):
+        with self._lock:
+            key = (namespace, value_hash)
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
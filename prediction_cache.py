@@ -0,0 +1,167 @@
+# =============================================================================
+# FILE: prediction_cache.py
+# DESKRIPSI: Cache hasil prediksi berbasis konten gambar (LRU + TTL),
+#            dengan opsi penyimpanan ke file SQLite agar bertahan saat restart.
+# =============================================================================
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_fingerprint(model_path):
+    """
+    Sidik jari (SHA-256) file model untuk membedakan versi model. Artefak
+    hasil `export_model.py` membawa hash ini di manifest `<artefak>.json`
+    (dihitung saat ekspor), sehingga file bobot besar yang di-mmap tidak
+    perlu dibaca seluruhnya setiap kali model dimuat.
+    """
+    manifest_path = f"{model_path}.json"
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            sha256 = json.load(f).get("sha256")
+        if sha256:
+            return sha256
+    return file_sha256(model_path)
+
+
+def image_key(image, fingerprint):
+    """
+    Membuat kunci cache dari byte gambar yang sudah di-decode ditambah sidik
+    jari model, sehingga gambar yang sama dengan model berbeda tidak bentrok.
+    """
+    digest = hashlib.sha256()
+    digest.update(fingerprint.encode())
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Cache prediksi di memori dengan eviksi LRU dan masa berlaku (TTL).
+    Jika `db_path` diisi, entri juga disimpan di SQLite sebagai tingkat kedua.
+    Aman dipakai dari banyak thread (satu proses Streamlit, banyak sesi).
+    """
+
+    def __init__(self, max_entries=None, ttl=None, db_path=None):
+        self.max_entries = max_entries or config.CACHE_CONFIG["max_cache_entries"]
+        self.ttl = ttl if ttl is not None else config.CACHE_CONFIG["data_cache_ttl"]
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (waktu_simpan, nilai)
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._open_db(db_path)
+
+    def _open_db(self, db_path):
+        """Membuka (atau membuat) tabel cache di file SQLite."""
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def _expired(self, created, now):
+        return self.ttl > 0 and now - created > self.ttl
+
+    def get(self, key):
+        """Mengambil nilai dari cache; mengembalikan None jika tidak ada/kedaluwarsa."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    value = json.loads(row[0])
+                    self._db.execute(
+                        "UPDATE predictions SET last_access = ? WHERE key = ?", (now, key)
+                    )
+                    self._db.commit()
+                    self._store(key, row[1], value)
+                    self.hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """Menyimpan nilai (harus bisa di-serialisasi ke JSON) ke cache."""
+        now = time.time()
+        with self._lock:
+            self._store(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO predictions (key, value, created, last_access)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                self._evict_db(now)
+                self._db.commit()
+
+    def _store(self, key, created, value):
+        self._entries[key] = (created, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _evict_db(self, now):
+        """Membuang entri SQLite yang kedaluwarsa, lalu yang paling lama tidak dipakai."""
+        if self.ttl > 0:
+            self._db.execute("DELETE FROM predictions WHERE created < ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM predictions WHERE key NOT IN ("
+            " SELECT key FROM predictions ORDER BY last_access DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self):
+        """Mengosongkan cache di memori dan di disk."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM predictions")
+                self._db.commit()
+
+    def stats(self):
+        """Ringkasan penggunaan cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
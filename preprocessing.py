@@ -0,0 +1,78 @@
+# =============================================================================
+# FILE: preprocessing.py
+# DESKRIPSI: Jalur pra-pemrosesan tanpa alokasi berulang. Gambar PIL di-crop
+#            tengah + resize dalam satu langkah lalu ditulis langsung ke slot
+#            buffer batch uint8 (N, H, W, 3) yang dialokasikan sekali per
+#            thread. Konversi float dan normalisasi ImageNet terjadi in-place
+#            di dalam graf model (lihat inference_net.InferenceNet.forward).
+# =============================================================================
+
+import threading
+
+import numpy as np
+from PIL import Image
+
+import config
+import metrics
+
+
+def crop_box(width, height, size):
+    """Kotak crop tengah dengan rasio `size`, meniru `Resize` validasi fastai."""
+    target_w, target_h = size
+    scale = min(width / target_w, height / target_h)
+    crop_w, crop_h = int(scale * target_w), int(scale * target_h)
+    left, top = (width - crop_w) // 2, (height - crop_h) // 2
+    return left, top, left + crop_w, top + crop_h
+
+
+def prepare_into(image: Image.Image, out: np.ndarray):
+    """
+    Crop tengah + resize bilinear `image` ke ukuran `out` (H, W, 3) uint8
+    dan menuliskannya langsung ke `out`. Mengembalikan `out`.
+    """
+    height, width = out.shape[:2]
+    with metrics.timed("transform"):
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        resized = image.resize((width, height), Image.BILINEAR, box=crop_box(*image.size, (width, height)))
+        np.copyto(out, np.asarray(resized))
+    return out
+
+
+def prepare_image(image: Image.Image, size=config.INPUT_SIZE):
+    """
+    Mengubah gambar PIL menjadi array uint8 (H, W, 3) berukuran `size`.
+    Meniru transform validasi `Resize` milik fastai: crop tengah sesuai
+    rasio target, lalu resize bilinear dalam satu langkah.
+    """
+    width, height = size
+    return prepare_into(image, np.empty((height, width, 3), dtype=np.uint8))
+
+
+class BatchBuffer:
+    """
+    Buffer batch uint8 yang dipakai ulang. Tiap thread punya buffer sendiri
+    (forward bisa berjalan bersamaan dari banyak sesi), dan buffer hanya
+    dialokasikan ulang saat batch yang diminta lebih besar dari sebelumnya.
+    """
+
+    def __init__(self, size=config.INPUT_SIZE):
+        self.size = size
+        self._local = threading.local()
+
+    def get(self, n):
+        array = getattr(self._local, "array", None)
+        if array is None or len(array) < n:
+            width, height = self.size
+            array = self._local.array = np.empty((n, height, width, 3), dtype=np.uint8)
+        return array[:n]
+
+    def fill(self, images):
+        """Menulis gambar PIL atau array siap-model ke buffer; mengembalikan view (N, H, W, 3)."""
+        batch = self.get(len(images))
+        for slot, image in zip(batch, images):
+            if isinstance(image, np.ndarray):
+                np.copyto(slot, image)
+            else:
+                prepare_into(image, slot)
+        return batch
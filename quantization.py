@@ -0,0 +1,171 @@
+# =============================================================================
+# FILE: quantization.py
+# DESKRIPSI: Kuantisasi int8 pasca-training untuk inferensi CPU, beserta
+#            laporan kesesuaian top-1 terhadap model fp32 pada folder berlabel.
+#
+# Contoh:
+#   python quantization.py --calib data/kalibrasi --eval data/validasi \
+#       --output models/my_model_int8.pt --report models/int8_report.json
+#   (artefak .pt bisa dipakai lewat backend torchscript: MODEL_PATH=models/my_model_int8.pt)
+# =============================================================================
+
+import argparse
+import copy
+import itertools
+import json
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+from torch import nn
+
+import config
+import inference_net
+from batch_classify import iter_image_paths, iter_labeled_images
+from export_model import export_torchscript, write_manifest
+from model_handler import ModelHandler
+from preprocessing import prepare_image
+
+
+def _select_engine():
+    """Memilih backend kuantisasi terbaik yang tersedia di CPU ini (x86 > fbgemm > qnnpack)."""
+    supported = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in supported:
+            torch.backends.quantized.engine = engine
+            return engine
+    raise RuntimeError("PyTorch ini tidak mendukung kuantisasi int8.")
+
+
+def quantize_static(net, calibration_batch, batch_size=config.BATCH_SIZE):
+    """
+    Kuantisasi statis (FX graph mode) untuk backbone + head: bobot dan aktivasi
+    int8. `calibration_batch` adalah array uint8 (N, H, W, 3) untuk mengukur
+    rentang aktivasi. Normalisasi tetap fp32 di dalam `InferenceNet`.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = _select_engine()
+    model = copy.deepcopy(net.model).cpu().eval()
+    width, height = config.INPUT_SIZE
+    example = (torch.randn(1, 3, height, width),)
+    prepared = prepare_fx(model, get_default_qconfig_mapping(engine), example)
+
+    calibrating = inference_net.InferenceNet(prepared).eval()
+    calibrating.mean.copy_(net.mean)
+    calibrating.std.copy_(net.std)
+    for start in range(0, len(calibration_batch), batch_size):
+        inference_net.run(calibrating, calibration_batch[start:start + batch_size])
+
+    quantized = inference_net.InferenceNet(convert_fx(prepared)).eval()
+    quantized.mean.copy_(net.mean)
+    quantized.std.copy_(net.std)
+    return quantized
+
+
+def quantize_dynamic(net):
+    """Kuantisasi dinamis: hanya layer Linear (head), aktivasi dikuantisasi saat runtime."""
+    _select_engine()
+    return torch.ao.quantization.quantize_dynamic(
+        copy.deepcopy(net).cpu().eval(), {nn.Linear}, dtype=torch.qint8
+    )
+
+
+def load_calibration_images(root, limit=None):
+    """Mengambil maksimal `limit` gambar dari folder sebagai array uint8 siap-model."""
+    limit = limit or config.QUANTIZATION_CONFIG["calibration_images"]
+    arrays = []
+    for path in itertools.islice(iter_image_paths(root), limit):
+        with Image.open(path) as image:
+            arrays.append(prepare_image(image))
+    return arrays
+
+
+def agreement_report(fp32_net, int8_net, root, class_names, batch_size=config.BATCH_SIZE):
+    """
+    Membandingkan model fp32 dan int8 pada folder berlabel (`root/<kelas>/...`):
+    kesesuaian top-1 antar model, akurasi masing-masing terhadap label,
+    kesesuaian per kelas, dan waktu forward rata-rata per gambar.
+    """
+    n_classes = len(class_names)
+    agree = np.zeros(n_classes, dtype=np.int64)
+    total = np.zeros(n_classes, dtype=np.int64)
+    correct = {"fp32": 0, "int8": 0}
+    seconds = {"fp32": 0.0, "int8": 0.0}
+
+    def flush(arrays, labels):
+        batch = np.stack(arrays)
+        labels = np.asarray(labels)
+        preds = {}
+        for name, net in (("fp32", fp32_net), ("int8", int8_net)):
+            start = time.perf_counter()
+            preds[name] = inference_net.run(net, batch).argmax(axis=1)
+            seconds[name] += time.perf_counter() - start
+            correct[name] += int((preds[name] == labels).sum())
+        np.add.at(total, labels, 1)
+        np.add.at(agree, labels, (preds["fp32"] == preds["int8"]).astype(np.int64))
+
+    arrays, labels = [], []
+    for path, label in iter_labeled_images(root, class_names):
+        with Image.open(path) as image:
+            arrays.append(prepare_image(image))
+        labels.append(label)
+        if len(arrays) == batch_size:
+            flush(arrays, labels)
+            arrays, labels = [], []
+    if arrays:
+        flush(arrays, labels)
+
+    n = int(total.sum())
+    if n == 0:
+        raise ValueError(f"Tidak ada gambar berlabel di {root} (subfolder harus bernama {class_names}).")
+    agreement = float(agree.sum() / n)
+    return {
+        "images": n,
+        "top1_agreement": agreement,
+        "passed": agreement >= config.QUANTIZATION_CONFIG["min_agreement"],
+        "min_agreement": config.QUANTIZATION_CONFIG["min_agreement"],
+        "accuracy": {name: correct[name] / n for name in correct},
+        "per_class_agreement": {
+            str(name): (float(agree[i] / total[i]) if total[i] else None)
+            for i, name in enumerate(class_names)
+        },
+        "ms_per_image": {name: 1000.0 * seconds[name] / n for name in seconds},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kuantisasi int8 model dan laporan akurasinya.")
+    parser.add_argument("--model", default=config.MODEL_PATH, help="Path Learner FastAI (.pkl)")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default=config.QUANTIZATION_CONFIG["mode"])
+    parser.add_argument("--calib", help="Folder gambar untuk kalibrasi (wajib untuk mode static)")
+    parser.add_argument("--eval", dest="eval_dir", help="Folder berlabel untuk laporan kesesuaian")
+    parser.add_argument("--output", default=str(config.MODEL_DIR / "my_model_int8.pt"))
+    parser.add_argument("--report", default=None, help="Simpan laporan ke file JSON")
+    args = parser.parse_args(argv)
+
+    handler = ModelHandler(args.model, use_cache=False, backend="fastai", slots=1)
+    calibration = load_calibration_images(args.calib) if args.calib else None
+    handler.quantize(calibration, mode=args.mode)
+    print(f"✅ Model dikuantisasi ({args.mode}).")
+
+    export_torchscript(handler._net, args.output)
+    write_manifest(args.output, handler.waste_types, "torchscript")
+    print(f"   > Disimpan ke {args.output}")
+
+    if args.eval_dir:
+        report = agreement_report(handler.fp32_net, handler._net, args.eval_dir, handler.waste_types)
+        print(json.dumps(report, indent=2))
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        if not report["passed"]:
+            print(f"⚠️ Kesesuaian top-1 {report['top1_agreement']:.2%} di bawah ambang "
+                  f"{report['min_agreement']:.2%}.")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
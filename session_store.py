@@ -0,0 +1,146 @@
+# =============================================================================
+# FILE: session_store.py
+# DESKRIPSI: State per sesi browser yang ringkas dan dibatasi memorinya.
+#            Alih-alih menyimpan buffer unggahan mentah dan dict hasil di
+#            `st.session_state` tanpa batas waktu, tiap sesi hanya punya hash
+#            konten, thumbnail JPEG kecil, dan array probabilitas float32.
+#            Satu store dipakai bersama seluruh proses; sesi yang menganggur
+#            dibuang lebih dulu, lalu yang paling lama tidak dipakai, saat
+#            total memori melewati budget.
+# =============================================================================
+
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import config
+import metrics
+
+# Perkiraan overhead objek Python per sesi (record, kunci dict, string kecil)
+RECORD_OVERHEAD = 512
+
+
+class SessionRecord:
+    """State satu sesi; `__slots__` agar tidak ada `__dict__` per objek."""
+
+    __slots__ = ("upload_key", "content_hash", "thumbnail", "probs", "labels", "last_access")
+
+    def __init__(self, upload_key, content_hash, thumbnail):
+        self.upload_key = upload_key      # file_id widget Streamlit, untuk mengenali unggahan yang sama
+        self.content_hash = content_hash  # SHA-256 byte unggahan
+        self.thumbnail = thumbnail        # JPEG tampilan (lihat image_ingest.DISPLAY_SIZE)
+        self.probs = None                 # float32 (jumlah_kelas,), None sebelum diklasifikasi
+        self.labels = ()                  # nama kelas untuk kolom `probs` (tuple bersama)
+        self.last_access = 0.0
+
+    @property
+    def nbytes(self):
+        probs_bytes = self.probs.nbytes if self.probs is not None else 0
+        return RECORD_OVERHEAD + len(self.thumbnail) + probs_bytes
+
+    def prediction(self):
+        """(nama kelas teratas, dict probabilitas) dalam bentuk yang sama dengan `ModelHandler.predict`."""
+        if self.probs is None:
+            return None, None
+        return self.labels[int(self.probs.argmax())], dict(zip(self.labels, self.probs.tolist()))
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def encode_thumbnail(image, quality=80):
+    """Thumbnail PIL -> byte JPEG (jauh lebih kecil dari buffer piksel di memori)."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class SessionStore:
+    """
+    Penyimpanan state sesi seluruh proses dengan budget memori. Aman dipakai
+    dari banyak thread skrip Streamlit sekaligus.
+    """
+
+    def __init__(self, budget_bytes=None, idle_ttl=None, on_evict=None):
+        self.budget = budget_bytes or config.SESSION_CONFIG["memory_budget_mb"] * 1024 * 1024
+        self.idle_ttl = idle_ttl if idle_ttl is not None else config.SESSION_CONFIG["idle_ttl"]
+        self.evictions = 0
+        self.on_evict = on_evict  # dipanggil dengan session_id saat sesi dibuang (di dalam lock; harus cepat)
+        self._records = OrderedDict()  # session_id -> SessionRecord, urut dari yang terlama dipakai
+        self._bytes = 0
+        self._labels = {}  # interning tuple nama kelas
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is not None:
+                record.last_access = time.time()
+                self._records.move_to_end(session_id)
+            return record
+
+    def put(self, session_id, record):
+        with self._lock:
+            old = self._records.pop(session_id, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            record.last_access = time.time()
+            self._records[session_id] = record
+            self._bytes += record.nbytes
+            self._evict(record.last_access, keep=session_id)
+
+    def set_prediction(self, session_id, probabilities):
+        """
+        Menyimpan dict probabilitas hasil `predict` sebagai array float32 yang
+        ringkas. False jika record sesi sudah dibuang (mis. selagi prediksi berjalan).
+        """
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None:
+                return False
+            labels = tuple(probabilities)
+            self._bytes -= record.nbytes
+            record.labels = self._labels.setdefault(labels, labels)
+            record.probs = np.fromiter(probabilities.values(), dtype=np.float32, count=len(labels))
+            self._bytes += record.nbytes
+            return True
+
+    def discard(self, session_id):
+        with self._lock:
+            record = self._records.pop(session_id, None)
+            if record is not None:
+                self._bytes -= record.nbytes
+
+    def _evict(self, now, keep=None):
+        """Buang sesi menganggur lebih dulu, lalu LRU sampai total di bawah budget."""
+        for session_id, record in list(self._records.items()):
+            if now - record.last_access <= self.idle_ttl:
+                break  # sisanya lebih baru (OrderedDict urut waktu akses)
+            if session_id != keep:
+                self._drop(session_id)
+        while self._bytes > self.budget and len(self._records) > 1:
+            session_id = next(iter(self._records))
+            if session_id == keep:
+                break
+            self._drop(session_id)
+
+    def _drop(self, session_id):
+        self._bytes -= self._records.pop(session_id).nbytes
+        self.evictions += 1
+        metrics.inc("session_evictions")
+        if self.on_evict is not None:
+            self.on_evict(session_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._records),
+                "used_mb": self._bytes / 2**20,
+                "budget_mb": self.budget / 2**20,
+                "evictions": self.evictions,
+            }
@@ -1,16 +1,19 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from PIL import Image
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+# pandas, numpy, dan plotly diimpor di dalam halaman yang membutuhkannya
+# agar halaman Home tampil tanpa menunggu library berat dimuat
 import base64
 from io import BytesIO
-import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 # Import custom modules
-from model_handler import ModelHandler
+import config
+import image_decode
+import metrics
+from camera_stream import StreamManager
+from model_handler import BackgroundModelLoader
+from image_ingest import ImageUpload
+from session_store import SessionRecord, SessionStore, content_hash, encode_thumbnail
 from utils import *
 
 # Page config
@@ -24,12 +27,95 @@ st.set_page_config(
 # Load custom CSS
 load_css()
 
-# Initialize model handler
+# Initialize model handler: dimuat + warmup di thread latar belakang sejak proses mulai
 @st.cache_resource
+def get_model_loader():
+    return BackgroundModelLoader(fast_model_path=config.CASCADE_CONFIG["fast_model_path"] or None)
+
+@st.cache_resource
+def get_metrics_dumper():
+    # Satu thread dumper per proses, hanya jika METRICS_FILE diisi
+    return metrics.start_file_dumper()
+
+@st.cache_resource
+def get_inference_executor():
+    # Dibagi semua sesi; ukurannya mengikuti jumlah slot inferensi model
+    return ThreadPoolExecutor(max_workers=config.CONCURRENCY_CONFIG["slots"],
+                              thread_name_prefix="classify")
+
+@st.cache_resource
+def get_stream_manager():
+    # Stream live semua sesi; dibatasi jumlahnya dan dihentikan saat sesi berhenti polling
+    return StreamManager()
+
+@st.cache_resource
+def get_session_store():
+    # State ringkas semua sesi dalam satu proses, dengan budget memori bersama.
+    # Sesi yang dibuang dari store juga kehilangan stream live-nya.
+    return SessionStore(on_evict=get_stream_manager().stop)
+
+def session_id():
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    return st.session_state.session_id
+
 def load_model():
-    return ModelHandler()
+    loader = get_model_loader()
+    try:
+        if loader.status == "loading":
+            with st.spinner("⏳ Loading model, please wait..."):
+                return loader.get()
+        return loader.get()
+    except Exception:
+        # Loader yang gagal tetap tersimpan di cache_resource; buang agar rerun berikutnya memuat ulang
+        get_model_loader.clear()
+        raise
+
+def show_model_status():
+    """Indikator kesiapan model di sidebar."""
+    loader = get_model_loader()
+    if loader.status == "ready":
+        st.success(f"🟢 Model ready ({loader.load_seconds:.1f}s)")
+        slots = loader.handler.slots.stats()
+        st.caption(f"Inference slots: {slots['in_flight']}/{slots['size']} busy, "
+                   f"{slots['waiting']} queued, avg wait {slots['avg_wait_ms']:.0f} ms")
+        sessions = get_session_store().stats()
+        st.caption(f"Sessions: {sessions['sessions']} using {sessions['used_mb']:.1f} / "
+                   f"{sessions['budget_mb']:.0f} MB, {sessions['evictions']} evicted")
+        cascade = loader.handler.cascade_stats()
+        if cascade is not None:
+            st.caption(f"Cascade: {cascade['fast_hit_rate']:.0%} answered by fast model, "
+                       f"{cascade['fast_ms_per_image']:.0f} / {cascade['full_ms_per_image']:.0f} ms per image "
+                       f"(fast / full)")
+    elif loader.status == "loading":
+        st.info("🟡 Model loading in background...")
+    else:
+        st.error("🔴 Model failed to load")
+
+def show_debug_panel():
+    """Panel latensi per tahap di sidebar; hanya tampil saat DEBUG aktif."""
+    with st.expander("🐞 Debug: stage latency"):
+        summary = metrics.REGISTRY.summary()
+        if not summary:
+            st.caption("No measurements yet.")
+        for stage, stats in summary.items():
+            st.caption(f"**{stage}**: n={stats['count']}, mean {stats['mean_ms']:.1f} ms, "
+                       f"p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms")
+        from image_decode import DECODE_BUDGET
+        st.caption(f"Decode memory: {DECODE_BUDGET.stats()}")
+        loader = get_model_loader()
+        if loader.status == "ready" and loader.handler.cache is not None:
+            st.caption(f"Prediction cache: {loader.handler.cache.stats()}")
+        if loader.status == "ready" and loader.handler.near_duplicates is not None:
+            st.caption(f"Near-duplicate index: {loader.handler.near_duplicates.stats()}")
+        st.caption(f"Session store: {get_session_store().stats()}")
+        st.caption(f"Live streams: {get_stream_manager().stats()}")
 
 def main():
+    # Mulai memuat model di latar belakang tanpa memblokir render halaman
+    get_model_loader()
+    get_metrics_dumper()
+
     # Header
     st.markdown("""
     <div class="main-header">
@@ -65,6 +151,10 @@ def main():
         </div>
         """, unsafe_allow_html=True)
 
+        show_model_status()
+        if config.DEBUG:
+            show_debug_panel()
+
     # Main content
     if page == "🏠 Home":
         show_home_page()
@@ -153,6 +243,10 @@ def show_home_page():
         """, unsafe_allow_html=True)
 
 def show_analytics_page():
+    import numpy as np
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     st.markdown("""
     <div class="page-header">
         <h2>📊 Model Analytics Dashboard</h2>
@@ -160,18 +254,40 @@ def show_analytics_page():
     </div>
     """, unsafe_allow_html=True)
     
-    # Sample data for demonstration (in real app, this would come from actual model training)
-    waste_types = ['Cardboard', 'Metal', 'Paper', 'Plastic', 'Glass']
+    # Hasil evaluate.py jika ada; jika belum pernah dijalankan, tampilkan data demo
+    from evaluate import load_report
+    report = load_report()
+    if report is None:
+        st.info("ℹ️ Showing demo figures. Run `python evaluate.py <labeled_folder>` to analyse the real model.")
+        waste_types = ['Cardboard', 'Metal', 'Paper', 'Plastic', 'Glass']
+        class_counts = [450, 380, 420, 500, 340]
+        distribution_title = "Training Data Distribution"
+        confusion_data = np.array([
+            [35, 0, 1, 2, 2],
+            [0, 43, 3, 0, 4],
+            [0, 0, 41, 0, 0],
+            [0, 0, 0, 58, 1],
+            [0, 4, 1, 0, 43]
+        ])
+        accuracy, precision, recall, f1 = 0.9298, 0.948, 0.951, 0.9297
+    else:
+        st.caption(f"Evaluated on {report['n_images']} images ({report['meta']['created']}, "
+                   f"{report['meta'].get('dataset', '')})")
+        waste_types = report['class_names']
+        class_counts = [m['support'] for m in report['class_metrics'].values()]
+        distribution_title = "Evaluation Data Distribution"
+        confusion_data = np.array(report['confusion_matrix'])
+        accuracy, precision, recall, f1 = (report['overall_accuracy'], report['overall_precision'],
+                                           report['overall_recall'], report['overall_f1'])
     
     col1, col2 = st.columns(2)
     
     with col1:
         # Class distribution
-        class_counts = [450, 380, 420, 500, 340]
         fig_dist = px.pie(
             values=class_counts,
             names=waste_types,
-            title="Training Data Distribution",
+            title=distribution_title,
             color_discrete_sequence=px.colors.qualitative.Set3
         )
         fig_dist.update_traces(textposition='inside', textinfo='percent+label')
@@ -207,15 +323,6 @@ def show_analytics_page():
     </div>
     """, unsafe_allow_html=True)
     
-    # Sample confusion matrix data
-    confusion_data = np.array([
-        [35, 0, 1, 2, 2],
-        [0, 43, 3, 0, 4],
-        [0, 0, 41, 0, 0],
-        [0, 0, 0, 58, 1],
-        [0, 4, 1, 0, 43]
-    ])
-    
     fig_cm = px.imshow(
         confusion_data,
         labels=dict(x="Predicted", y="Actual", color="Count"),
@@ -226,13 +333,14 @@ def show_analytics_page():
     )
     
     # Add text annotations
+    threshold = confusion_data.max() / 2
     for i in range(len(waste_types)):
         for j in range(len(waste_types)):
             fig_cm.add_annotation(
                 x=j, y=i,
                 text=str(confusion_data[i][j]),
                 showarrow=False,
-                font=dict(color="white" if confusion_data[i][j] > 50 else "black")
+                font=dict(color="white" if confusion_data[i][j] > threshold else "black")
             )
     
     fig_cm.update_layout(height=500, title_font_size=16)
@@ -242,22 +350,139 @@ def show_analytics_page():
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Overall Accuracy", "92.98%")
+        st.metric("Overall Accuracy", f"{accuracy:.2%}")
     with col2:
-        st.metric("Precision", "94.8%")
+        st.metric("Precision", f"{precision:.1%}")
     with col3:
-        st.metric("Recall", "95.1%")
+        st.metric("Recall", f"{recall:.1%}")
     with col4:
-        st.metric("F1 Score", "92.97%")
+        st.metric("F1 Score", f"{f1:.2%}")
+
+    if report is not None:
+        # Reliability diagram: akurasi vs confidence rata-rata per bin
+        bins = [b for b in report['calibration']['bins'] if b['count']]
+        fig_cal = go.Figure()
+        fig_cal.add_trace(go.Bar(x=[b['confidence'] for b in bins], y=[b['accuracy'] for b in bins],
+                                 width=1.0 / len(report['calibration']['bins']), name='Accuracy',
+                                 marker_color='#4ecdc4', customdata=[b['count'] for b in bins],
+                                 hovertemplate='confidence %{x:.2f}<br>accuracy %{y:.2f}<br>n=%{customdata}'))
+        fig_cal.add_trace(go.Scatter(x=[0, 1], y=[0, 1], mode='lines', name='Perfect calibration',
+                                     line=dict(color='#ff6b6b', dash='dash')))
+        fig_cal.update_layout(
+            title=f"Calibration (ECE {report['calibration']['ece']:.3f})",
+            xaxis_title="Confidence",
+            yaxis_title="Accuracy",
+            height=400,
+            title_font_size=16
+        )
+        st.plotly_chart(fig_cal, use_container_width=True)
 
 # Helper function to clear previous results when a new image is provided
 def clear_all_results():
-    """A callback to clear image and prediction data from session_state."""
-    keys_to_clear = ['image_buffer', 'prediction', 'probabilities']
-    for key in keys_to_clear:
+    """A callback to clear image and prediction data for this session."""
+    pending = st.session_state.get('pending')
+    if pending is not None:
+        pending.cancel()
+    get_session_store().discard(session_id())
+    get_stream_manager().stop(session_id())
+    for key in ['pending', 'prediction_error']:
         if key in st.session_state:
             del st.session_state[key]
 
+def ingest_upload(buffer):
+    """
+    Validasi dan thumbnail dibuat sekali per file. Yang disimpan untuk sesi
+    hanya hash konten, thumbnail JPEG, dan nanti array probabilitas; byte
+    mentah dan hasil decode dilepas setelah fungsi ini selesai.
+    Mengembalikan (record, pesan_error).
+    """
+    store = get_session_store()
+    key = getattr(buffer, 'file_id', None) or str(id(buffer))
+    record = store.get(session_id())
+    if record is not None and record.upload_key == key:
+        return record, None
+    upload = ImageUpload.from_file(buffer)
+    is_valid, message = validate_image(upload)
+    if not is_valid:
+        return None, message
+    record = SessionRecord(key, content_hash(upload.data), encode_thumbnail(upload.thumbnail()))
+    store.put(session_id(), record)
+    return record, None
+
+def classify_bytes(model_handler, data, tta=False, session=None):
+    """
+    Dijalankan di executor: decode byte unggahan sekali pada skala input model
+    (draft JPEG), bukan skala tampilan seperti thumbnail, lalu prediksi.
+    """
+    return model_handler.predict(image_decode.decode(data), tta=tta, session=session)
+
+def collect_prediction():
+    """Pindahkan hasil klasifikasi yang sudah selesai ke session store. True jika tidak ada yang ditunggu."""
+    future = st.session_state.get('pending')
+    if future is None:
+        return True
+    if not future.done():
+        return False
+    del st.session_state['pending']
+    try:
+        _, probabilities = future.result()
+        if not get_session_store().set_prediction(session_id(), probabilities):
+            # Record sesi ini dibuang (budget memori/idle) selagi prediksi berjalan
+            st.session_state.prediction_error = config.ERROR_MESSAGES["session_expired"]
+    except Exception as e:
+        st.session_state.prediction_error = str(e)
+    return True
+
+@st.fragment(run_every=0.2)
+def poll_prediction():
+    """Hanya fragment ini yang dijalankan ulang selama menunggu; halaman dirender ulang saat hasil siap."""
+    if collect_prediction():
+        st.rerun()
+    st.info("🤖 Analyzing Image...")
+
+def show_stream_controls(model_handler):
+    """Mode stream: sumber video dibaca di sisi server (kamera lokal, RTSP, atau file rekaman)."""
+    sources = config.STREAM_CONFIG["sources"]
+    if not sources:
+        st.info("No stream sources configured (set STREAM_SOURCES on the server).")
+        return
+    source = st.selectbox("Video source", sources,
+                          help="Sources configured by the server administrator (STREAM_SOURCES)")
+    manager = get_stream_manager()
+    stream = manager.get(session_id())
+    if stream is None or not stream.running:
+        if st.button("▶️ Start Stream"):
+            try:
+                manager.start(session_id(), model_handler, source)
+            except (ImportError, RuntimeError, ValueError) as e:
+                st.error(f"❌ {e}")
+            else:
+                st.rerun()
+    else:
+        if st.button("⏹️ Stop Stream"):
+            manager.stop(session_id())
+            st.rerun()
+        show_stream_view()
+
+@st.fragment(run_every=0.5)
+def show_stream_view():
+    """Frame terakhir yang diklasifikasi beserta FPS efektif dan jumlah frame yang dibuang."""
+    # Polling fragment ini sekaligus heartbeat sesi untuk StreamManager
+    stream = get_stream_manager().get(session_id())
+    if stream is None:
+        return
+    if stream.error is not None:
+        st.error(f"❌ Stream stopped: {stream.error}")
+        return
+    if stream.latest is not None:
+        frame, prediction, probabilities, _ = stream.latest
+        st.image(frame, caption=f"{get_waste_emoji(prediction)} {prediction} "
+                                f"({max(probabilities.values()):.1%})")
+    stats = stream.stats()
+    st.caption(f"{stats['effective_fps']:.1f} fps effective / {stats['source_fps']:.0f} fps source, "
+               f"forward {stats['forward_ms']:.0f} ms, {stats['frames_skipped']} skipped, "
+               f"{stats['frames_dropped']} dropped")
+
 def show_classifier_page():
     st.markdown("""
     <div class="page-header">
@@ -297,7 +522,7 @@ def show_classifier_page():
     col1, col2 = st.columns([1, 1])
     
     with col1:
-        tab1, tab2 = st.tabs(["📁 Upload Image", "📸 Use Camera"])
+        tab1, tab2, tab3 = st.tabs(["📁 Upload Image", "📸 Use Camera", "🎥 Live Stream"])
 
         with tab1:
             uploaded_file = st.file_uploader(
@@ -307,8 +532,8 @@ def show_classifier_page():
                 # Callback ini akan menghapus hasil lama saat file baru dipilih
                 on_change=clear_all_results
             )
-            if uploaded_file is not None:
-                st.session_state.image_buffer = uploaded_file
+            buffer = uploaded_file
+            from_camera = False
 
         with tab2:
             camera_file = st.camera_input(
@@ -317,91 +542,105 @@ def show_classifier_page():
                 on_change=clear_all_results
             )
             if camera_file is not None:
-                st.session_state.image_buffer = camera_file
+                buffer = camera_file
+                from_camera = True
+
+        with tab3:
+            show_stream_controls(model_handler)
         
         # Logika terpusat untuk menampilkan gambar dan tombol klasifikasi
-        if 'image_buffer' in st.session_state:
-            image = Image.open(st.session_state.image_buffer)
-            st.image(image, caption="Image for Classification")
+        if buffer is not None:
+            # Yang disimpan di sesi hanya hash, thumbnail, dan probabilitas (lihat session_store.py)
+            record, message = ingest_upload(buffer)
+            if record is None:
+                st.error(f"❌ {message}")
+                return
+            st.image(record.thumbnail, caption="Image for Classification")
             
-            if st.button("🔍 Image Classification", type="primary"):
-                with st.spinner("🤖 Analyzing Image..."):
-                    time.sleep(1)
-                    try:
-                        # Lakukan prediksi menggunakan gambar dari buffer
-                        prediction, probabilities = model_handler.predict(image)
-                        
-                        # Simpan hasil prediksi di session_state
-                        st.session_state.prediction = prediction
-                        st.session_state.probabilities = probabilities
-                        
-                    except Exception as e:
-                        st.error(f"❌ Error: {str(e)}")
-
-    # Kolom hasil tidak perlu diubah. Ia akan kosong secara otomatis
-    # karena `clear_all_results` menghapus 'prediction' dari session_state.
+            tta = st.checkbox("🔁 Test-time augmentation",
+                              help="Averages flipped, rotated and zoomed variants in one batch; "
+                                   "more robust on ambiguous items, slightly slower")
+            if st.button("🔍 Image Classification", type="primary", disabled='pending' in st.session_state):
+                # Prediksi dikirim ke executor bersama agar thread skrip tidak terblokir
+                st.session_state.pop('prediction_error', None)
+                # Near-duplicate hanya untuk jepretan kamera berurutan dalam sesi ini
+                st.session_state.pending = get_inference_executor().submit(
+                    classify_bytes, model_handler, buffer.getvalue(), tta=tta,
+                    session=session_id() if from_camera else None)
+
+            if not collect_prediction():
+                poll_prediction()
+            if 'prediction_error' in st.session_state:
+                st.error(f"❌ Error: {st.session_state.prediction_error}")
+
+    # Kolom hasil kosong secara otomatis karena `clear_all_results`
+    # membuang state sesi ini dari session store.
+    record = get_session_store().get(session_id())
     
     with col2:
-        if hasattr(st.session_state, 'prediction') and st.session_state.prediction:
+        if record is not None and record.probs is not None:
             st.markdown("""
             <div class="results-section">
                 <h3>🎯 Classification Results</h3>
             </div>
             """, unsafe_allow_html=True)
             
-            # Main prediction
-            prediction = st.session_state.prediction
-            probabilities = st.session_state.probabilities
+            with metrics.timed("render"):
+                # Main prediction
+                prediction, probabilities = record.prediction()
             
-            # Get confidence score
-            max_prob = max(probabilities.values())
+                # Get confidence score
+                max_prob = max(probabilities.values())
             
-            st.markdown(f"""
-            <div class="prediction-card">
-                <div class="prediction-main">
-                    <h2>{get_waste_emoji(prediction)} {prediction.upper()}</h2>
-                    <div class="confidence-score">
-                        <span>Confidence: {max_prob:.1%}</span>
+                st.markdown(f"""
+                <div class="prediction-card">
+                    <div class="prediction-main">
+                        <h2>{get_waste_emoji(prediction)} {prediction.upper()}</h2>
+                        <div class="confidence-score">
+                            <span>Confidence: {max_prob:.1%}</span>
+                        </div>
                     </div>
                 </div>
-            </div>
-            """, unsafe_allow_html=True)
+                """, unsafe_allow_html=True)
             
-            # Probability distribution
-            st.markdown("### 📊 Probability Distribution")
+                # Probability distribution
+                import pandas as pd
+                import plotly.express as px
+
+                st.markdown("### 📊 Probability Distribution")
             
-            prob_df = pd.DataFrame(
-                list(probabilities.items()),
-                columns=['Category', 'Probability']
-            )
-            prob_df = prob_df.sort_values('Probability', ascending=True)
+                prob_df = pd.DataFrame(
+                    list(probabilities.items()),
+                    columns=['Category', 'Probability']
+                )
+                prob_df = prob_df.sort_values('Probability', ascending=True)
             
-            fig_prob = px.bar(
-                prob_df,
-                x='Probability',
-                y='Category',
-                orientation='h',
-                color='Probability',
-                color_continuous_scale='Viridis',
-                title="Confidence Scores for All Categories"
-            )
-            fig_prob.update_layout(
-                height=300,
-                showlegend=False,
-                title_font_size=14
-            )
-            fig_prob.update_traces(texttemplate='%{x:.1%}', textposition='outside')
+                fig_prob = px.bar(
+                    prob_df,
+                    x='Probability',
+                    y='Category',
+                    orientation='h',
+                    color='Probability',
+                    color_continuous_scale='Viridis',
+                    title="Confidence Scores for All Categories"
+                )
+                fig_prob.update_layout(
+                    height=300,
+                    showlegend=False,
+                    title_font_size=14
+                )
+                fig_prob.update_traces(texttemplate='%{x:.1%}', textposition='outside')
             
-            st.plotly_chart(fig_prob, use_container_width=True)
+                st.plotly_chart(fig_prob, use_container_width=True)
             
-            # Disposal recommendations
-            st.markdown("### ♻️ Disposal Recommendations")
-            recommendations = get_disposal_recommendations(prediction)
-            st.markdown(f"""
-            <div class="recommendation-card">
-                {recommendations}
-            </div>
-            """, unsafe_allow_html=True)
+                # Disposal recommendations
+                st.markdown("### ♻️ Disposal Recommendations")
+                recommendations = get_disposal_recommendations(prediction)
+                st.markdown(f"""
+                <div class="recommendation-card">
+                    {recommendations}
+                </div>
+                """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -512,18 +512,25 @@ def validate_image(image):
     """Validate uploaded image"""
     if image is None:
         return False, "No image uploaded"
-    
-    # Check file size (limit to 10MB)
-    if hasattr(image, 'size') and image.size > 10 * 1024 * 1024:
-        return False, "Image too large (max 10MB)"
-    
-    # Check image format
-    try:
-        from PIL import Image
-        img = Image.open(image)
-        if img.format not in ['JPEG', 'PNG', 'JPG']:
-            return False, "Unsupported format (use JPEG/PNG)"
+
+    # Unggahan yang sudah dibungkus ImageUpload cukup divalidasi dari header
+    from image_ingest import ImageUpload
+    if isinstance(image, ImageUpload):
+        return image.validate()
+
+    # Gambar PIL yang sudah di-decode: `size` berupa (lebar, tinggi), bukan byte
+    from PIL import Image
+    if isinstance(image, Image.Image):
+        from image_decode import check_dimensions
+        try:
+            check_dimensions(image.size)
+        except ValueError as e:
+            return False, str(e)
         return True, "Valid image"
+
+    # File/UploadedFile: ukuran byte, format, dan dimensi diperiksa dari header
+    try:
+        return ImageUpload.from_file(image).validate()
     except Exception as e:
         return False, f"Invalid image: {str(e)}"
 
@@ -541,6 +548,9 @@ def resize_image(image, max_size=(800, 600)):
 
 def get_image_info(image):
     """Get image information"""
+    from image_ingest import ImageUpload
+    if isinstance(image, ImageUpload):
+        return image.info()
     try:
         info = {
             'format': image.format,
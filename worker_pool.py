@@ -0,0 +1,209 @@
+# =============================================================================
+# FILE: worker_pool.py
+# DESKRIPSI: Pool worker inferensi multi-proses (pre-fork). Model dimuat
+#            sekali di proses induk, lalu proses worker di-fork sehingga
+#            bobot dibagi lewat copy-on-write. Tiap worker memakai jumlah
+#            thread torch yang dipatok dan menerima batch lewat antrean lokal.
+#
+# Catatan: jangan menjalankan forward di proses induk sebelum fork; runtime
+# OpenMP yang sudah aktif bisa macet di proses anak. Warmup dilakukan di
+# masing-masing worker (`InferenceWorkerPool.warmup`).
+# =============================================================================
+
+import gc
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+import config
+import metrics
+from preprocessing import prepare_image
+
+
+def _worker_main(handler, tasks, results, num_threads, warmup_barrier):
+    """
+    Loop proses worker: ambil batch, jalankan forward, kirim hasil beserta
+    durasi forward-nya (registry metrik worker tidak terlihat dari induk).
+    """
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass  # backend onnx tidak memakai torch
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, batch, is_warmup = task
+        start = time.perf_counter()
+        try:
+            probs = handler._run(batch)
+            results.put((task_id, probs, None, time.perf_counter() - start))
+        except Exception as e:
+            results.put((task_id, None, str(e), None))
+        if is_warmup:
+            # Tahan worker ini sampai semua worker mengambil satu batch warmup
+            try:
+                warmup_barrier.wait(config.WORKER_CONFIG["task_timeout"] or None)
+            except threading.BrokenBarrierError:
+                pass
+
+
+class InferenceWorkerPool:
+    """
+    Pool proses worker di atas satu `ModelHandler` yang sudah dimuat.
+    `predict_batch` punya tanda tangan yang sama dengan milik handler,
+    sehingga bisa langsung menggantikannya (mis. di `inference_server.py`).
+    """
+
+    def __init__(self, handler, workers=None, threads_per_worker=None):
+        if not handler.is_model_loaded():
+            raise RuntimeError("Model belum dimuat; pool worker tidak bisa dibuat.")
+        if handler.fast is not None:
+            # Worker memanggil `handler._run` langsung, jadi model cepat tidak akan pernah dipakai
+            raise ValueError("Mode kaskade tidak didukung oleh pool worker; muat handler tanpa fast_model_path.")
+        self.handler = handler
+        self.workers = workers or config.WORKER_CONFIG["workers"] or os.cpu_count()
+        self.threads_per_worker = (threads_per_worker or config.WORKER_CONFIG["threads_per_worker"]
+                                   or max(1, (os.cpu_count() or 1) // self.workers))
+
+        ctx = mp.get_context("fork")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._warmup_barrier = ctx.Barrier(self.workers)
+        self.timeout = config.WORKER_CONFIG["task_timeout"]
+        self.broken = None  # pesan error setelah ada worker yang mati
+        self._closing = False
+
+        # Bekukan objek yang ada agar GC di worker tidak menyentuh (dan menyalin) halaman memorinya
+        gc.collect()
+        gc.freeze()
+        self._processes = []
+        for i in range(self.workers):
+            process = ctx.Process(
+                target=_worker_main,
+                args=(handler, self._tasks, self._results, self.threads_per_worker, self._warmup_barrier),
+                name=f"inference-worker-{i}",
+                daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+        gc.unfreeze()
+
+        # Thread pembagi hasil baru dibuat setelah semua fork selesai
+        self._dispatcher = threading.Thread(target=self._dispatch, name="pool-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            # Timeout agar worker yang mati tetap terdeteksi saat tidak ada hasil yang masuk
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                message = ()
+            self._check_workers()
+            if message == ():
+                continue
+            if message is None:
+                break
+            task_id, probs, error, seconds = message
+            if seconds is not None:
+                # Tahap "forward" dan counter batch dicatat di induk, yang melayani /metrics
+                metrics.REGISTRY.observe("forward", seconds)
+                metrics.inc("batches")
+            with self._lock:
+                future = self._futures.pop(task_id, None)
+            if future is None or future.done():
+                continue  # sudah digagalkan (pool rusak) atau dibatalkan karena timeout
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(probs)
+
+    def _check_workers(self):
+        """
+        Worker yang mati (OOM, segfault) membawa serta batch yang sedang ia
+        kerjakan. Antrean tugas dipakai bersama, jadi tidak diketahui future
+        mana yang hilang: pool ditandai rusak dan semua future yang tertunda
+        digagalkan, alih-alih menunggu selamanya.
+        """
+        if self._closing or self.broken is not None:
+            return
+        dead = [p for p in self._processes if p.exitcode is not None]
+        if not dead:
+            return
+        self.broken = ", ".join(f"{p.name} (exit {p.exitcode})" for p in dead) + " berhenti"
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(BrokenProcessPool(self.broken))
+
+    def submit(self, batch, _warmup=False):
+        """Mengirim batch uint8 (N, H, W, 3) ke worker; mengembalikan Future berisi probabilitas."""
+        if self.broken is not None:
+            raise BrokenProcessPool(self.broken)
+        future = Future()
+        task_id = next(self._ids)
+        with self._lock:
+            self._futures[task_id] = future
+        self._tasks.put((task_id, batch, _warmup))
+        return future
+
+    def _result(self, future):
+        """Menunggu hasil dengan batas waktu; worker yang macet tidak boleh menahan request selamanya."""
+        try:
+            return future.result(timeout=self.timeout or None)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def predict_batch(self, images, batch_size=None):
+        """Seperti `ModelHandler.predict_batch`, tetapi potongan batch dibagi ke semua worker."""
+        images = list(images)
+        n_classes = len(self.handler.waste_types)
+        if not images:
+            return np.empty(0, dtype=np.int64), np.empty((0, n_classes), dtype=np.float32)
+
+        batch_size = batch_size or self.handler.batch_size
+        futures = []
+        for start in range(0, len(images), batch_size):
+            chunk = images[start:start + batch_size]
+            futures.append(self.submit(np.stack([
+                img if isinstance(img, np.ndarray) else prepare_image(img) for img in chunk
+            ])))
+        probs = np.concatenate([self._result(future) for future in futures])
+        metrics.inc("images", len(images))
+        return probs.argmax(axis=1), probs
+
+    def warmup(self):
+        """
+        Satu forward dummy per worker (dijalankan di proses worker, bukan
+        induk). Tiap worker menunggu di barrier setelah batch warmup-nya,
+        sehingga worker yang cepat tidak mengambil jatah warmup worker lain.
+        """
+        width, height = config.INPUT_SIZE
+        dummy = np.zeros((1, height, width, 3), dtype=np.uint8)
+        for future in [self.submit(dummy, _warmup=True) for _ in self._processes]:
+            self._result(future)
+
+    def close(self):
+        """Menghentikan semua worker dan thread pembagi hasil."""
+        self._closing = True
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+        self._results.put(None)
+        self._dispatcher.join(timeout=5)